@@ -4,25 +4,22 @@
 Main Flask Server for Indian Cattle Breed Recognition System
 """
 
-from flask import Flask, request, jsonify, render_template, send_file
+from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
 import os
-import numpy as np
-import cv2
-from PIL import Image
-import tensorflow as tf
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
-import json
 from datetime import datetime
 
 # Import custom modules
+# ML modules (model, image_processing, ...) pull in TensorFlow/OpenCV/PIL and
+# are imported by the background loader, so startup stays fast
 try:
-    from model import CattleBreedClassifier
-    from image_processing import ImageProcessor
     from utils import allowed_file, create_response, get_breed_info
 except ImportError:
-    CattleBreedClassifier = None
-    ImageProcessor = None
     def allowed_file(f): return True
     def create_response(s, **k): return jsonify(k)
     def get_breed_info(): return []
@@ -42,36 +39,157 @@ UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 MODEL_PATH = 'models/indian_cattle_model.h5'
 
+# Inference backend: 'keras' (float32 .h5) or 'tflite' (quantized export from export_tflite.py)
+MODEL_BACKEND = os.environ.get('MODEL_BACKEND', 'keras')
+TFLITE_MODEL_PATH = os.environ.get('TFLITE_MODEL_PATH', 'models/cattle_breed_model_int8.tflite')
+
+# Model files per backend, the first one that loads wins; keras is the fallback
+MODEL_FILES = {
+    'keras': ('models/cattle_breed_model.h5', MODEL_PATH),
+    'tflite': (TFLITE_MODEL_PATH,)
+}
+INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', 0)) or None
+
+# Micro-batching for /api/predict: requests arriving within the wait window
+# are coalesced into one model call
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 16))
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', 5))
+
+# Prediction cache keyed by upload digest + model version
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 1024))
+PREDICTION_CACHE_TTL = int(os.environ.get('PREDICTION_CACHE_TTL', 3600))
+PREDICTION_CACHE_PERCEPTUAL = os.environ.get('PREDICTION_CACHE_PERCEPTUAL', '0') == '1'
+
+# Max images accepted by /api/predict/batch in one request
+MAX_BATCH_IMAGES = int(os.environ.get('MAX_BATCH_IMAGES', 64))
+
+# Request body cap for /api/predict/batch (other routes keep MAX_CONTENT_LENGTH,
+# which is also the per-image cap in a batch). 256MB fits a lot of ~50 phone
+# photos at 3-5MB each; raise it with MAX_BATCH_IMAGES for bigger lots
+MAX_BATCH_UPLOAD_MB = int(os.environ.get('MAX_BATCH_UPLOAD_MB', 256))
+
+# Threads decoding/resizing batch uploads in parallel (0 = one per core)
+PREPROCESS_WORKERS = int(os.environ.get('PREPROCESS_WORKERS', 0)) or None
+
+# fsync policy for the background log writer: always, interval or never
+LOG_FSYNC = os.environ.get('LOG_FSYNC', 'interval')
+
+# Threads for /api/health/check image branches, which run beside the text branch
+HEALTH_CHECK_WORKERS = int(os.environ.get('HEALTH_CHECK_WORKERS', 8))
+
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # Global variables
+health_check_executor = ThreadPoolExecutor(max_workers=HEALTH_CHECK_WORKERS, thread_name_prefix='health-check')
+# Pattern learning from health check cases, after the response - one thread,
+# so a slow pattern store never takes threads from the request path
+learning_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='case-learning')
 model_classifier = None
 image_processor = None
+inference_batcher = None
+prediction_cache = None
+
+# Readiness of the ML components: loading -> ready | failed, and the backend
+# actually serving predictions ('dummy' without a model)
+model_state = {
+    'status': 'loading',
+    'error': None,
+    'backend': None,
+    'started_at': None,
+    'ready_at': None
+}
+
+def load_classifier(classifier_class, backend):
+    """Classifier for the first model file of a backend that exists and loads, or None"""
+    for model_path in MODEL_FILES.get(backend, ()):
+        if os.path.exists(model_path):
+            classifier = classifier_class(model_path, backend=backend, num_threads=INFERENCE_THREADS)
+            if classifier.backend is not None:
+                return classifier
+    return None
 
 def initialize_application():
-    """Initialize the application components"""
-    global model_classifier, image_processor
+    """Start loading the ML components in a background thread
+    
+    Non-ML routes (pages, auth, admin, symptom-only health check) serve
+    immediately; prediction routes answer 503 until the loader finishes.
+    """
+    from log_writer import log_writer
     
+    log_writer.set_fsync(LOG_FSYNC)
+    log_writer.start()
+    
+    model_state['status'] = 'loading'
+    model_state['error'] = None
+    model_state['started_at'] = datetime.now().isoformat()
+    
+    loader = threading.Thread(target=load_ml_components, name='model-loader', daemon=True)
+    loader.start()
+    return loader
+
+def load_ml_components():
+    """Import the ML stack, load and warm up the model"""
+    global model_classifier, image_processor, inference_batcher, prediction_cache
+    
+    try:
+        from model import CattleBreedClassifier
+        from image_processing import ImageProcessor
+        from inference_batcher import InferenceBatcher
+        from prediction_cache import PredictionCache
+    except Exception as e:
+        print(f"Failed to import ML components: {str(e)}")
+        model_state['status'] = 'failed'
+        model_state['error'] = str(e)
+        return
+    
+    status, error = 'ready', None
     try:
-        image_processor = ImageProcessor()
+        processor = ImageProcessor(workers=PREPROCESS_WORKERS)
         
-        # Use the trained model
-        trained_model_path = 'models/cattle_breed_model.h5'
-        if os.path.exists(trained_model_path):
-            model_classifier = CattleBreedClassifier(trained_model_path)
-            print("Trained model loaded successfully")
-        elif os.path.exists(MODEL_PATH):
-            model_classifier = CattleBreedClassifier(MODEL_PATH)
-            print("AI model loaded successfully")
-        else:
-            model_classifier = CattleBreedClassifier()
-            print("No model found, using dummy predictions")
+        classifier = load_classifier(CattleBreedClassifier, MODEL_BACKEND)
+        if classifier is None and MODEL_BACKEND != 'keras':
+            print(f"WARNING: MODEL_BACKEND={MODEL_BACKEND} but no model in {MODEL_FILES.get(MODEL_BACKEND, ())} "
+                  f"could be loaded - falling back to the keras backend")
+            classifier = load_classifier(CattleBreedClassifier, 'keras')
+        if classifier is None:
+            classifier = CattleBreedClassifier()
+            print("No model could be loaded, using dummy predictions")
+        
+        # Pay graph tracing now rather than on the first user request
+        classifier.warmup()
             
     except Exception as e:
+        # Keep serving dummy predictions, but report not-ready
         print(f"Failed to initialize: {str(e)}")
-        model_classifier = CattleBreedClassifier()
-        image_processor = ImageProcessor()
+        status, error = 'failed', str(e)
+        classifier = CattleBreedClassifier()
+        processor = ImageProcessor(workers=PREPROCESS_WORKERS)
+    
+    inference_batcher = InferenceBatcher(
+        classifier,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS
+    )
+    prediction_cache = PredictionCache(
+        max_entries=PREDICTION_CACHE_SIZE,
+        ttl_seconds=PREDICTION_CACHE_TTL,
+        perceptual=PREDICTION_CACHE_PERCEPTUAL
+    )
+    
+    # Publish the classifier last - prediction routes check it to see if loading is done
+    image_processor = processor
+    model_classifier = classifier
+    
+    model_state['error'] = error
+    model_state['backend'] = classifier.backend.name if classifier.backend else 'dummy'
+    model_state['ready_at'] = datetime.now().isoformat()
+    model_state['status'] = status
+    print(f"ML components {status}")
+
+def model_not_ready_response():
+    """503 for prediction routes hit while the model is still loading"""
+    return create_response(False, error='Model is still loading, try again shortly'), 503
 
 # Routes
 @app.route('/')
@@ -108,15 +226,40 @@ def register():
     result = register_user(data.get('username'), data.get('password'))
     return jsonify(result)
 
+def _learn_health_case(case_data):
+    """Learn patterns from a logged health check case (runs after the response is sent)"""
+    from learning_system import learning_system
+    
+    try:
+        learning_system.learn_from_case(case_data)
+    except Exception as e:
+        print(f"Failed to learn from case {case_data.get('case_id')}: {str(e)}")
+
 @app.route('/api/health/check', methods=['POST'])
 def health_check_api():
     """Health check API endpoint - handles image, text, and symptoms"""
-    from tools import symptom_tool, disease_tool, vision_tool
+    from tools import symptom_tool, disease_tool, vision_tool, feedback_tool
     from agent_orchestrator import decide_next_action
-    import os
-    from werkzeug.utils import secure_filename
     
-    # Get form data
+    # Per-stage durations, returned as timings_ms
+    started = time.perf_counter()
+    timings = {}
+    
+    def timed(stage, func, *args):
+        stage_started = time.perf_counter()
+        result = func(*args)
+        timings[stage] = round((time.perf_counter() - stage_started) * 1000, 3)
+        return result
+    
+    # Image branch: decoded from the request buffer (never saved) in a worker,
+    # while the text branch runs on the request thread
+    vision_future = None
+    if 'image' in request.files:
+        file = request.files['image']
+        if file and file.filename:
+            vision_future = health_check_executor.submit(timed, 'vision', vision_tool, file.read())
+    
+    # Text branch: form data, checkboxes and text description
     text_description = request.form.get('text_description', '')
     
     # Extract symptoms from checkboxes
@@ -132,7 +275,7 @@ def health_check_api():
     # Extract symptoms from text description
     text_symptoms = {}
     if text_description:
-        text_symptoms = symptom_tool(text_description)
+        text_symptoms = timed('symptoms', symptom_tool, text_description)
     
     # Merge symptoms (text overrides unknown checkbox values)
     merged_symptoms = checkbox_symptoms.copy()
@@ -140,33 +283,20 @@ def health_check_api():
         if value != 'unknown' and merged_symptoms.get(key) in ['no', 'unknown']:
             merged_symptoms[key] = value
     
-    # Handle image if uploaded
-    vision_result = {}
-    image_path = None
-    if 'image' in request.files:
-        file = request.files['image']
-        if file and file.filename:
-            filename = secure_filename(file.filename)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-            filename = timestamp + filename
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(image_path)
-            vision_result = vision_tool(image_path)
-            # Clean up
-            try:
-                os.remove(image_path)
-            except:
-                pass
-    
-    # Use orchestrator to decide if we need more info
-    decision = decide_next_action(vision_result, merged_symptoms, {}, text_description)
-    
-    # Get disease prediction
-    prediction = disease_tool(merged_symptoms, vision_result)
-    
-    # Generate case ID and log for learning
-    case_id = datetime.now().strftime('%Y%m%d_%H%M%S')
-    from tools import feedback_tool
+    # Use orchestrator to decide if we need more info (symptoms only - no need
+    # to wait for the image)
+    decision = timed('orchestrator', decide_next_action, {}, merged_symptoms, {}, text_description)
+    
+    # Join the image branch
+    vision_result = vision_future.result() if vision_future else {}
+    
+    # Get disease prediction only when the orchestrator has enough to go on
+    prediction = None
+    if decision['action'] == 'predict':
+        prediction = timed('prediction', disease_tool, merged_symptoms, vision_result)
+    
+    # Unique per request - feedback is joined to the case through it
+    case_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
     case_data = {
         'case_id': case_id,
         'symptoms': merged_symptoms,
@@ -174,14 +304,17 @@ def health_check_api():
         'text_input': text_description,
         'disease_prediction': prediction
     }
-    feedback_tool(case_data)
+    # Queued for the log writer before responding, so feedback can join the
+    # case - does not wait for the disk
+    timed('logging', feedback_tool, case_data, None, None, False)
     
     analysis_type = []
-    if image_path: analysis_type.append('Image')
+    if vision_future: analysis_type.append('Image')
     if text_description: analysis_type.append('Text')
     if any(v != 'no' and v != 'unknown' for v in checkbox_symptoms.values()): analysis_type.append('Symptoms')
     
-    return jsonify({
+    timings['total'] = round((time.perf_counter() - started) * 1000, 3)
+    response = jsonify({
         'success': True,
         'case_id': case_id,
         'analysis_type': ' + '.join(analysis_type) if analysis_type else 'Symptoms',
@@ -189,32 +322,36 @@ def health_check_api():
         'vision_result': vision_result,
         'text_input': text_description,
         'orchestrator_decision': decision,
-        'prediction': prediction
+        'prediction': prediction,
+        'timings_ms': timings
     })
+    
+    # Learn from the case once the response has gone out
+    response.call_on_close(lambda: learning_executor.submit(_learn_health_case, case_data))
+    return response
 
 @app.route('/api/feedback', methods=['POST'])
 def feedback_api():
     """Feedback endpoint for learning"""
-    from tools import feedback_tool
+    from learning_system import learning_system
     
     data = request.json
     case_id = data.get('case_id')
     rating = data.get('rating')
     vet_diagnosis = data.get('vet_diagnosis')
     
-    result = feedback_tool(
-        {'case_id': case_id},
-        rating=rating,
-        vet_diagnosis=vet_diagnosis
-    )
+    # Feedback is joined to the case logged by /api/health/check - no stub case
+    learning_system.log_feedback(case_id, {
+        'rating': rating,
+        'actual_diagnosis': vet_diagnosis,
+        'labeled': vet_diagnosis is not None
+    })
     
     return jsonify({'success': True, 'message': 'Feedback recorded'})
 
 @app.route('/api/breed/feedback', methods=['POST'])
 def breed_feedback_api():
     """Breed prediction feedback for self-learning"""
-    import os
-    
     data = request.json
     predicted_breed = data.get('predicted_breed')
     correct_breed = data.get('correct_breed')
@@ -231,10 +368,9 @@ def breed_feedback_api():
         'timestamp': timestamp
     }
     
-    # Save to breed feedback file
-    os.makedirs('learning_data', exist_ok=True)
-    with open('learning_data/breed_feedback.jsonl', 'a') as f:
-        f.write(json.dumps(feedback_entry) + '\n')
+    # Store for learning (queued to the background writer)
+    from learning_system import learning_system
+    learning_system.log_breed_feedback(feedback_entry)
     
     return jsonify({
         'success': True,
@@ -243,10 +379,10 @@ def breed_feedback_api():
 
 @app.route('/api/learning/stats', methods=['GET'])
 def learning_stats():
-    """Get learning statistics"""
+    """Get learning statistics (?buckets=1 adds cases per day and per hour)"""
     from learning_system import learning_system
     
-    stats = learning_system.get_statistics()
+    stats = learning_system.get_statistics(buckets=request.args.get('buckets') == '1')
     return jsonify({'success': True, 'stats': stats})
 
 @app.route('/api/admin/patterns', methods=['GET'])
@@ -261,51 +397,69 @@ def admin_patterns():
 
 @app.route('/api/admin/cases', methods=['GET'])
 def admin_cases():
-    """Get recent cases"""
-    import os
+    """Get recent cases, newest first
     
-    limit = int(request.args.get('limit', 20))
-    cases = []
+    Query params: limit, before (case_id cursor from next_before),
+    disease, since and until (ISO date or timestamp)
+    """
+    from learning_system import learning_system
     
-    if os.path.exists('learning_data/cases.jsonl'):
-        with open('learning_data/cases.jsonl', 'r') as f:
-            lines = f.readlines()
-            for line in lines[-limit:]:
-                cases.append(json.loads(line))
+    limit = int(request.args.get('limit', 20))
     
-    return jsonify({'success': True, 'cases': list(reversed(cases))})
+    try:
+        cases, next_before = learning_system.get_cases(
+            limit=limit,
+            before=request.args.get('before'),
+            disease=request.args.get('disease'),
+            since=request.args.get('since'),
+            until=request.args.get('until')
+        )
+    except KeyError as e:
+        return jsonify({'success': False, 'error': str(e.args[0])}), 404
+    
+    return jsonify({'success': True, 'cases': cases, 'next_before': next_before})
 
 @app.route('/api/admin/export', methods=['GET'])
 def admin_export():
-    """Export learning data"""
-    from learning_system import learning_system
-    import io
-    from flask import send_file
-    
-    export_data = {
-        'patterns': learning_system.patterns,
-        'statistics': learning_system.get_statistics(),
-        'exported_at': datetime.now().isoformat()
-    }
+    """Export learning data, including the case and feedback logs (streamed)
     
-    data_str = json.dumps(export_data, indent=2)
-    return send_file(
-        io.BytesIO(data_str.encode()),
-        mimetype='application/json',
-        as_attachment=True,
-        download_name=f'learning_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    ?format=columnar gives JSON lines: a typed schema per table followed by
+    column chunks; the default is a single JSON document. since and until
+    (ISO date or timestamp) limit the exported cases and feedback.
+    """
+    from learning_system import learning_system
+    from learning_export import export_json, export_columnar, buffered
+    from flask import Response, stream_with_context
+    
+    export_format = request.args.get('format', 'json')
+    since, until = request.args.get('since'), request.args.get('until')
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    if export_format == 'columnar':
+        chunks = export_columnar(learning_system, since=since, until=until)
+        mimetype = 'application/x-ndjson'
+        filename = f'learning_data_{timestamp}.columnar.jsonl'
+    elif export_format == 'json':
+        chunks = export_json(learning_system, since=since, until=until)
+        mimetype = 'application/json'
+        filename = f'learning_data_{timestamp}.json'
+    else:
+        return jsonify({'success': False, 'error': f'Unknown export format: {export_format}'}), 400
+    
+    return Response(
+        stream_with_context(buffered(chunks)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
 
 @app.route('/api/admin/clear', methods=['POST'])
 def admin_clear():
     """Clear all learning data"""
-    import os
-    import shutil
+    from learning_system import learning_system
     
     try:
-        if os.path.exists('learning_data'):
-            shutil.rmtree('learning_data')
-            os.makedirs('learning_data', exist_ok=True)
+        # Stored records, learned patterns and their delta logs
+        learning_system.clear()
         
         return jsonify({'success': True, 'message': 'All data cleared'})
     except Exception as e:
@@ -327,45 +481,64 @@ def admin_retrain():
 @app.route('/api/admin/breed-feedback', methods=['GET'])
 def admin_breed_feedback():
     """Get breed feedback statistics"""
-    from collections import defaultdict
-    
-    feedback_file = 'learning_data/breed_feedback.jsonl'
+    from learning_system import learning_system
     
-    stats = {'total': 0, 'correct': 0, 'wrong': 0}
-    corrections = defaultdict(list)
+    stats, corrections = learning_system.get_breed_feedback_summary()
     
-    if os.path.exists(feedback_file):
-        with open(feedback_file, 'r') as f:
-            for line in f:
-                entry = json.loads(line)
-                stats['total'] += 1
-                if entry['is_correct']:
-                    stats['correct'] += 1
-                else:
-                    stats['wrong'] += 1
-                    if entry.get('correct_breed'):
-                        corrections[entry['predicted_breed']].append(entry['correct_breed'])
+    return jsonify({
+        'success': True,
+        'stats': stats,
+        'corrections': corrections
+    })
+
+@app.route('/api/admin/breed-feedback/matrix', methods=['GET'])
+def admin_breed_confusion_matrix():
+    """Breed confusion matrix (rows actual, columns predicted) with precision/recall
     
-    stats['accuracy'] = round(stats['correct'] / stats['total'] * 100, 1) if stats['total'] > 0 else 0
+    Only breeds seen in feedback are included unless ?all=1
+    """
+    from learning_system import learning_system
     
+    include_empty = request.args.get('all') == '1'
     return jsonify({
         'success': True,
-        'stats': stats,
-        'corrections': dict(corrections)
+        **learning_system.get_breed_confusion_matrix(include_empty=include_empty)
     })
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Liveness endpoint - answers as soon as the process is up"""
     return create_response(
         success=True,
         data={
             'status': 'healthy',
             'timestamp': datetime.now().isoformat(),
-            'model_loaded': model_classifier is not None
+            'model_loaded': model_state['status'] == 'ready',
+            'model_status': model_state['status'],
+            'model_backend': model_state['backend'],
+            'requested_backend': MODEL_BACKEND
         }
     )
 
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint - 200 once the model is loaded, 503 while loading or after a failure"""
+    ready = model_state['status'] == 'ready'
+    return jsonify({
+        'success': ready,
+        'status': model_state['status'],
+        'error': model_state['error'],
+        'started_at': model_state['started_at'],
+        'ready_at': model_state['ready_at'],
+        'timestamp': datetime.now().isoformat()
+    }), 200 if ready else 503
+
+@app.route('/api/admin/cache', methods=['GET'])
+def admin_cache():
+    """Get prediction cache hit/miss statistics"""
+    stats = prediction_cache.stats() if prediction_cache else {}
+    return jsonify({'success': True, 'cache': stats})
+
 @app.route('/api/breeds', methods=['GET'])
 def get_supported_breeds():
     """Get list of supported Indian breeds"""
@@ -384,30 +557,119 @@ def predict_breed():
         if file.filename == '' or not allowed_file(file.filename):
             return create_response(False, error='Invalid file format')
         
-        # Save uploaded file
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-        filename = timestamp + filename
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        # Decode straight from the request buffer - no temp file on disk
+        image_bytes = file.read()
         
-        try:
-            # Process image and predict
-            if image_processor and model_classifier:
-                processed_image = image_processor.preprocess_image(filepath)
-                prediction_result = model_classifier.predict(processed_image)
-            else:
-                raise Exception("Model not initialized")
-        finally:
-            # Clean up uploaded file
-            if os.path.exists(filepath):
-                os.remove(filepath)
+        if not (image_processor and model_classifier):
+            return model_not_ready_response()
+        
+        # Dummy predictions are random placeholders - never cache them
+        use_cache = prediction_cache is not None and model_classifier.model is not None
+        model_version = model_classifier.model_version
+        
+        # Identical upload already predicted by this model version
+        if use_cache:
+            cache_key = prediction_cache.make_key(image_bytes, model_version)
+            cached_result = prediction_cache.get(cache_key)
+            if cached_result:
+                return create_response(success=True, data=cached_result)
+        
+        # Process image
+        processed_image = image_processor.preprocess_image_bytes(image_bytes)
+        
+        # Re-encoded near-duplicate (perceptual mode)
+        if use_cache:
+            cached_result = prediction_cache.get_similar(processed_image, model_version)
+            if cached_result:
+                return create_response(success=True, data=cached_result)
+        
+        # Predict
+        if inference_batcher:
+            prediction_result = inference_batcher.predict(processed_image)
+        else:
+            prediction_result = model_classifier.predict(processed_image)
+        
+        if use_cache and prediction_result.get('success'):
+            prediction_cache.put(cache_key, prediction_result, model_version, processed_image)
         
         return create_response(success=True, data=prediction_result)
         
     except Exception as e:
         return create_response(False, error=str(e))
 
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_breed_batch():
+    """Batch prediction endpoint - one multipart request for a whole animal lot"""
+    # Larger body than single uploads; set before the form is parsed (over the
+    # cap, parsing raises 413 for the errorhandler)
+    request.max_content_length = MAX_BATCH_UPLOAD_MB * 1024 * 1024
+    files = request.files.getlist('images')
+        
+    try:
+        if not files:
+            return create_response(False, error='No image files provided')
+        
+        if len(files) > MAX_BATCH_IMAGES:
+            return create_response(False, error=f'Too many images. Max per batch: {MAX_BATCH_IMAGES}')
+        
+        if not (image_processor and model_classifier):
+            return model_not_ready_response()
+        
+        import numpy as np
+        
+        results = [None] * len(files)
+        positions = []
+        uploads = []
+        
+        # Error entries carry the same timestamp key as predictions
+        timestamp = datetime.now().isoformat()
+        max_image_bytes = app.config['MAX_CONTENT_LENGTH']
+        
+        for i, file in enumerate(files):
+            if file.filename == '' or not allowed_file(file.filename):
+                results[i] = {'success': False, 'error': 'Invalid file format', 'timestamp': timestamp}
+                continue
+            data = file.read()
+            if len(data) > max_image_bytes:
+                results[i] = {'success': False, 'error': f'File too large. Max size: {max_image_bytes // (1024 * 1024)}MB',
+                              'timestamp': timestamp}
+                continue
+            positions.append(i)
+            uploads.append(data)
+        
+        # Decode every upload in parallel, straight into one preallocated batch;
+        # bad files get their own error entry
+        width, height = image_processor.target_size
+        batch = np.empty((len(uploads), height, width, 3), dtype=np.float32)
+        errors = image_processor.preprocess_batch_into(uploads, batch)
+        
+        valid = []
+        for i, error in zip(positions, errors):
+            if error:
+                results[i] = {'success': False, 'error': error, 'timestamp': timestamp}
+            else:
+                valid.append(i)
+        
+        # One model call for all decodable images
+        if valid:
+            if len(valid) < len(uploads):
+                batch = batch[[error is None for error in errors]]
+            predictions = model_classifier.predict_batch(batch)
+            for i, prediction in zip(valid, predictions):
+                results[i] = prediction
+        
+        for file, result in zip(files, results):
+            result['filename'] = file.filename
+        
+        return create_response(success=True, data={
+            'count': len(results),
+            'processed': len(valid),
+            'results': results
+        })
+    
+    except Exception as e:
+        return create_response(False, error=str(e))
+
 @app.route('/api/upload', methods=['POST'])
 def upload_image():
     """Handle image upload"""
@@ -438,6 +700,8 @@ def upload_image():
 # Error handlers
 @app.errorhandler(413)
 def too_large(e):
+    if request.endpoint == 'predict_breed_batch':
+        return create_response(False, error=f"Batch too large. Max size: {MAX_BATCH_UPLOAD_MB}MB per request")
     return create_response(False, error="File too large. Max size: 16MB")
 
 @app.errorhandler(404)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Batch Triage - orchestrator actions and rule-based diseases for many cases
+Symptoms are encoded into an (N, 6) code array and looked up in the
+precomputed decision tables with NumPy; results come back as columns
+"""
+
+import argparse
+import json
+from collections import Counter
+
+import numpy as np
+
+from decision_table import (STATE_CODES, SHAPE, VISION_SIGNS, DECISION_RECORDS, DECISION_IDS,
+                            PREDICTION_RECORDS, PREDICTION_IDS)
+from pattern_table import SYMPTOM_FIELDS
+
+# Cases read and triaged per chunk by the CLI
+CHUNK_SIZE = 100000
+
+# Per-record label columns, indexed by record id
+_ACTIONS = np.array([record["action"] for record in DECISION_RECORDS])
+_DISEASE_COLUMNS = {
+    column: np.array([record[column] for record in PREDICTION_RECORDS])
+    for column in ("disease", "risk_level", "vet_urgency")
+}
+_DECISION_IDS = DECISION_IDS.ravel()
+_PREDICTION_IDS = PREDICTION_IDS.reshape(-1, PREDICTION_IDS.shape[-1])
+
+def encode_batch(symptoms_list):
+    """(N, 6) int8 array of symptom state codes (0 = unknown), columns in SYMPTOM_FIELDS order"""
+    codes = np.zeros((len(symptoms_list), len(SYMPTOM_FIELDS)), dtype=np.int8)
+    for column, field in enumerate(SYMPTOM_FIELDS):
+        field_codes = STATE_CODES[field]
+        codes[:, column] = [field_codes.get((symptoms or {}).get(field), 0) for symptoms in symptoms_list]
+    return codes
+
+def encode_signs_batch(vision_results):
+    """(N,) int8 array of vision sign bit masks"""
+    masks = np.zeros(len(vision_results), dtype=np.int8)
+    for bit, sign in enumerate(VISION_SIGNS):
+        present = [sign in ((vision or {}).get("disease_signs") or ()) for vision in vision_results]
+        masks |= np.array(present, dtype=np.int8) << bit
+    return masks
+
+def triage_codes(codes, sign_masks=None):
+    """Decision and prediction record ids for encoded cases: (decision ids, prediction ids)"""
+    states = np.ravel_multi_index(codes.T.astype(np.intp), SHAPE)
+    if sign_masks is None:
+        sign_masks = np.zeros(len(states), dtype=np.intp)
+    return _DECISION_IDS[states], _PREDICTION_IDS[states, sign_masks]
+
+def triage_batch(symptoms_list, vision_results=None):
+    """Columnar triage results for a list of symptom dicts (and vision results)
+    
+    Same answers as decide_next_action and the rule part of disease_tool
+    (learned patterns are not consulted). Label columns are NumPy string
+    arrays; the id columns index decision_table's DECISION_RECORDS and
+    PREDICTION_RECORDS for the full records.
+    """
+    codes = encode_batch(symptoms_list)
+    sign_masks = encode_signs_batch(vision_results) if vision_results is not None else None
+    decision_ids, prediction_ids = triage_codes(codes, sign_masks)
+    return {
+        "decision_id": decision_ids,
+        "prediction_id": prediction_ids,
+        "action": _ACTIONS[decision_ids],
+        **{column: labels[prediction_ids] for column, labels in _DISEASE_COLUMNS.items()}
+    }
+
+def _case_chunks(cases_path, chunk_size):
+    """Logged cases (records with symptoms) from every segment, in chunks (read-only)"""
+    from jsonl_log import iter_log_records
+    
+    chunk = []
+    for record in iter_log_records(cases_path):
+        if isinstance(record, dict) and "symptoms" in record:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def rescore_cases(cases_path, output_path=None, chunk_size=CHUNK_SIZE):
+    """Re-run rule-based triage over every logged case
+    
+    Returns a summary: case count, counts per action and disease, and how
+    many rule-based predictions (learned ones excluded) would change.
+    Writes one {"case_id", "action", "disease", "risk_level", "previous_disease"}
+    line per case to output_path when given.
+    """
+    total = changed = 0
+    actions, diseases = Counter(), Counter()
+    output = open(output_path, 'w') if output_path else None
+    
+    try:
+        for cases in _case_chunks(cases_path, chunk_size):
+            results = triage_batch([case["symptoms"] for case in cases],
+                                   [case.get("vision_result") for case in cases])
+            total += len(cases)
+            actions.update(results["action"].tolist())
+            diseases.update(results["disease"].tolist())
+            
+            previous = [case.get("disease_prediction") or {} for case in cases]
+            for prediction, disease in zip(previous, results["disease"].tolist()):
+                if prediction.get("disease") and not prediction.get("learned") and prediction["disease"] != disease:
+                    changed += 1
+            
+            if output:
+                for i, case in enumerate(cases):
+                    output.write(json.dumps({
+                        "case_id": case.get("case_id"),
+                        "action": str(results["action"][i]),
+                        "disease": str(results["disease"][i]),
+                        "risk_level": str(results["risk_level"][i]),
+                        "previous_disease": previous[i].get("disease")
+                    }) + "\n")
+    finally:
+        if output:
+            output.close()
+    
+    return {
+        "cases": total,
+        "actions": dict(actions),
+        "diseases": dict(diseases),
+        "changed_rule_predictions": changed
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Re-run rule-based triage over logged cases')
+    parser.add_argument('--cases', default='learning_data/cases.jsonl')
+    parser.add_argument('--output', help='JSONL file for the per-case results')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    
+    print(json.dumps(rescore_cases(args.cases, args.output, args.chunk_size), indent=2))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Inference Latency Benchmark
+Compares model.predict against the compiled, bucketed inference path
+and against TFLite backends
+"""
+
+import argparse
+import time
+import numpy as np
+
+from model import CattleBreedClassifier
+
+def percentile_ms(samples, q):
+    """Percentile of a list of second timings, in milliseconds"""
+    return round(float(np.percentile(samples, q)) * 1000, 2)
+
+def time_calls(fn, batch, iterations):
+    """Time repeated calls of fn(batch)"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(batch)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def run_benchmark(model_path, batch_sizes, iterations, backend=None, num_threads=None):
+    """Print p50/p99 latency for the legacy and backend inference paths"""
+    classifier = CattleBreedClassifier(model_path, backend=backend, num_threads=num_threads)
+    if classifier.model is None:
+        print(f"Could not load model from {model_path}")
+        return
+    
+    height, width = classifier.input_size
+    keras_model = classifier.backend.name == 'keras'
+    
+    # First call on each path includes tracing - report it separately
+    if keras_model:
+        sample = np.random.rand(1, height, width, 3).astype(np.float32)
+        start = time.perf_counter()
+        classifier.model.predict(sample, verbose=0)
+        legacy_first = time.perf_counter() - start
+        print(f"First model.predict call: {legacy_first * 1000:.1f} ms")
+    
+    start = time.perf_counter()
+    classifier.warmup()
+    warmup_time = time.perf_counter() - start
+    
+    print(f"{classifier.backend.name} warmup: {warmup_time * 1000:.1f} ms")
+    print()
+    print(f"{'batch':>5}  {'path':<14} {'p50 ms':>9} {'p99 ms':>9} {'img/s':>9}")
+    
+    for batch_size in batch_sizes:
+        batch = np.random.rand(batch_size, height, width, 3).astype(np.float32)
+        paths = [(classifier.backend.name, classifier.predict_probabilities)]
+        if keras_model:
+            paths.insert(0, ('model.predict', lambda b: classifier.model.predict(b, verbose=0)))
+        
+        for name, fn in paths:
+            fn(batch)
+            samples = time_calls(fn, batch, iterations)
+            throughput = batch_size / np.median(samples)
+            print(f"{batch_size:>5}  {name:<14} {percentile_ms(samples, 50):>9} "
+                  f"{percentile_ms(samples, 99):>9} {throughput:>9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark breed model inference latency')
+    parser.add_argument('--model', default='models/cattle_breed_model.h5')
+    parser.add_argument('--batch-sizes', default='1,4,16')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--backend', choices=['keras', 'tflite'], default=None)
+    parser.add_argument('--threads', type=int, default=None, help='TFLite interpreter threads')
+    args = parser.parse_args()
+    
+    sizes = [int(s) for s in args.batch_sizes.split(',') if s]
+    run_benchmark(args.model, sizes, args.iterations, backend=args.backend, num_threads=args.threads)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Breed Feedback Analytics - checkpointed incremental aggregation
+Totals, corrections and a breed x breed confusion matrix are updated from
+new feedback only; the aggregate and its read cursor are checkpointed
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from model import INDIAN_BREEDS
+
+# Matrix labels: INDIAN_BREEDS ids, plus one bucket for names outside the list
+BREED_LABELS = [name for name, _ in sorted(INDIAN_BREEDS.items(), key=lambda item: item[1])]
+OTHER_LABEL = 'Other'
+LABELS = BREED_LABELS + [OTHER_LABEL]
+OTHER_ID = len(BREED_LABELS)
+
+def breed_id(name):
+    """Matrix index for a breed name ('Red Sindhi' and 'Red_Sindhi' are the same breed)"""
+    if not name:
+        return OTHER_ID
+    return INDIAN_BREEDS.get(str(name).strip().replace(' ', '_'), OTHER_ID)
+
+class BreedFeedbackAggregator:
+    """Incremental breed feedback statistics over a storage backend
+    
+    The source provides breed_feedback_since(cursor) -> (records, cursor,
+    restarted); the cursor is opaque (a row id or a [segment, offset] pair)
+    and restarted means it no longer applies (log truncated or cleared) and
+    the records start from the beginning.
+    """
+    
+    def __init__(self, source, checkpoint_path):
+        self.source = source
+        self.checkpoint_path = checkpoint_path
+        self._lock = threading.Lock()
+        self._reset_state()
+        self._load_checkpoint()
+    
+    def _reset_state(self):
+        self.cursor = 0
+        self.stats = {'total': 0, 'correct': 0, 'wrong': 0}
+        self.corrections = defaultdict(list)
+        # Rows: actual (corrected) breed, columns: predicted breed
+        self.matrix = np.zeros((len(LABELS), len(LABELS)), dtype=np.int64)
+    
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('source') != self.source.name or checkpoint.get('labels') != LABELS:
+                print("Breed analytics checkpoint is for another source or breed list - rebuilding")
+                return
+            self.cursor = checkpoint['cursor']
+            self.stats = checkpoint['stats']
+            self.corrections = defaultdict(list, checkpoint['corrections'])
+            self.matrix = np.array(checkpoint['matrix'], dtype=np.int64)
+        except (ValueError, KeyError) as e:
+            print(f"Rebuilding breed analytics: {str(e)}")
+            self._reset_state()
+    
+    def _save_checkpoint(self):
+        checkpoint = {
+            'source': self.source.name,
+            'cursor': self.cursor,
+            'labels': LABELS,
+            'stats': self.stats,
+            'corrections': self.corrections,
+            'matrix': self.matrix.tolist()
+        }
+        temp_path = self.checkpoint_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, self.checkpoint_path)
+    
+    def _add(self, entry):
+        predicted = entry.get('predicted_breed')
+        is_correct = bool(entry.get('is_correct'))
+        actual = predicted if is_correct else entry.get('correct_breed')
+        
+        self.stats['total'] += 1
+        if is_correct:
+            self.stats['correct'] += 1
+        else:
+            self.stats['wrong'] += 1
+            if entry.get('correct_breed'):
+                self.corrections[predicted].append(entry['correct_breed'])
+        
+        if actual:
+            self.matrix[breed_id(actual), breed_id(predicted)] += 1
+    
+    def refresh(self):
+        """Fold in feedback recorded since the last call"""
+        with self._lock:
+            records, cursor, restarted = self.source.breed_feedback_since(self.cursor)
+            if restarted:
+                self._reset_state()
+            for entry in records:
+                self._add(entry)
+            if cursor != self.cursor or restarted:
+                self.cursor = cursor
+                self._save_checkpoint()
+    
+    def reset(self):
+        """Forget everything (after the feedback has been cleared)"""
+        with self._lock:
+            self._reset_state()
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+    
+    def summary(self):
+        """Totals (with accuracy) and per-breed corrections"""
+        self.refresh()
+        with self._lock:
+            stats = dict(self.stats)
+            stats['accuracy'] = round(stats['correct'] / stats['total'] * 100, 1) if stats['total'] > 0 else 0
+            return stats, {breed: list(names) for breed, names in self.corrections.items()}
+    
+    def confusion_matrix(self, include_empty=False):
+        """Confusion matrix with per-breed precision and recall
+        
+        By default only breeds that appear in feedback are included.
+        """
+        self.refresh()
+        with self._lock:
+            matrix = self.matrix.copy()
+        
+        true_positives = np.diag(matrix)
+        actual_totals = matrix.sum(axis=1)
+        predicted_totals = matrix.sum(axis=0)
+        
+        if include_empty:
+            ids = np.arange(len(LABELS))
+        else:
+            ids = np.flatnonzero(actual_totals + predicted_totals)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = np.where(predicted_totals > 0, true_positives / predicted_totals, np.nan)
+            recall = np.where(actual_totals > 0, true_positives / actual_totals, np.nan)
+        
+        per_breed = {}
+        for i in ids:
+            per_breed[LABELS[i]] = {
+                'precision': None if np.isnan(precision[i]) else round(float(precision[i]), 4),
+                'recall': None if np.isnan(recall[i]) else round(float(recall[i]), 4),
+                'support': int(actual_totals[i]),
+                'predicted': int(predicted_totals[i])
+            }
+        
+        return {
+            'labels': [LABELS[i] for i in ids],
+            'matrix': matrix[np.ix_(ids, ids)].tolist(),
+            'axes': {'rows': 'actual', 'columns': 'predicted'},
+            'per_breed': per_breed
+        }
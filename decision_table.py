@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Decision Table - triage rules compiled over the whole symptom state space
+Orchestrator and rule-based disease decisions are precomputed at import;
+a request costs one index computation and one table lookup
+"""
+
+import itertools
+
+import numpy as np
+
+from pattern_table import SYMPTOM_FIELDS
+
+# States the rules tell apart; any other value (or a missing field) is unknown
+SYMPTOM_STATES = {
+    field: ("normal", "low", "stopped") if field == "appetite" else ("yes", "no")
+    for field in SYMPTOM_FIELDS
+}
+
+# Vision signs the rules use, one bit each
+VISION_SIGNS = ("respiratory_distress",)
+
+# Follow-up question per missing field
+QUESTIONS = {
+    "fever": "Does the animal have fever?",
+    "appetite": "Is it eating normally?",
+    "cough": "Is the animal coughing?",
+    "weakness": "Is the animal weak or lying down?"
+}
+
+# Rules are tried in order and the first match wins. "when" is one condition
+# or a list of alternatives; a condition maps fields to their allowed values,
+# plus "known": (min, max) known fields, "missing": fields of which at least
+# one is unknown, and "signs": vision signs of which at least one is present.
+#
+# Decisions report the first missing_fields missing fields and ask up to
+# max_questions of the "ask" fields that are missing (among the first
+# ask_within missing fields, if set). {known} in the note is the known count.
+DECISION_RULES = [
+    {
+        "when": {"known": (0, 1)},
+        "action": "ask_more",
+        "missing_fields": 3,
+        "ask": ("fever", "appetite", "cough"),
+        "ask_within": 3,
+        "max_questions": 3,
+        "note": "Only {known} symptoms known. Need at least 2."
+    },
+    {
+        "when": [{"fever": ("yes",), "cough": ("yes",)}, {"fever": ("yes",), "nasal_discharge": ("yes",)}],
+        "action": "predict",
+        "note": "Fever + respiratory symptoms. Proceed to disease model."
+    },
+    {
+        "when": {"fever": ("yes",), "digestive_issue": ("yes",)},
+        "action": "predict",
+        "note": "Fever + digestive issue. Proceed to disease model."
+    },
+    {
+        "when": [{"appetite": ("low", "stopped"), "weakness": ("yes",)},
+                 {"appetite": ("low", "stopped"), "digestive_issue": ("yes",)}],
+        "action": "predict",
+        "note": "Appetite + weakness/digestive pattern. Proceed to disease model."
+    },
+    {
+        "when": {"known": (3, len(SYMPTOM_FIELDS))},
+        "action": "predict",
+        "note": "{known} symptoms present. Sufficient for prediction."
+    },
+    {
+        "when": {"known": (2, 2), "missing": ("fever", "weakness")},
+        "action": "ask_more",
+        "missing_fields": 1,
+        "ask": ("fever", "weakness"),
+        "max_questions": 1,
+        "note": "2 symptoms present but pattern unclear. Need one more."
+    },
+    {
+        "when": {},
+        "action": "predict",
+        "note": "Proceeding with available data."
+    }
+]
+
+# Rule-based predictions of disease_tool (when no learned pattern is confident)
+DISEASE_RULES = [
+    {
+        "when": [{"fever": ("yes",), "cough": ("yes",), "nasal_discharge": ("yes",)},
+                 {"signs": ("respiratory_distress",)}],
+        "disease": "Respiratory Infection (possible Pneumonia)",
+        "risk_level": "High",
+        "reason": "Fever with cough and nasal discharge indicates respiratory infection",
+        "care_steps": [
+            "Keep animal in dry, warm place",
+            "Ensure clean water available",
+            "Isolate from other animals"
+        ],
+        "vet_urgency": "Call vet immediately - needs antibiotics"
+    },
+    {
+        "when": {"fever": ("yes",), "digestive_issue": ("yes",)},
+        "disease": "Digestive Infection (possible Enteritis)",
+        "risk_level": "High",
+        "reason": "Fever with digestive issues suggests infection",
+        "care_steps": [
+            "Provide clean water frequently",
+            "Stop solid feed temporarily",
+            "Keep animal clean"
+        ],
+        "vet_urgency": "Call vet today - may need IV fluids"
+    },
+    {
+        "when": {"appetite": ("low", "stopped"), "weakness": ("yes",)},
+        "disease": "General Weakness or Nutritional Deficiency",
+        "risk_level": "Medium",
+        "reason": "Loss of appetite with weakness",
+        "care_steps": [
+            "Offer fresh green fodder",
+            "Check for mineral deficiency",
+            "Monitor for other symptoms"
+        ],
+        "vet_urgency": "Call vet if no improvement in 24 hours"
+    },
+    {
+        "when": {"cough": ("yes",)},
+        "disease": "Mild Respiratory Issue",
+        "risk_level": "Low",
+        "reason": "Cough without other major symptoms",
+        "care_steps": [
+            "Keep in dust-free area",
+            "Ensure good ventilation",
+            "Monitor closely"
+        ],
+        "vet_urgency": "Call vet if cough worsens or fever develops"
+    },
+    {
+        "when": {},
+        "disease": "Unable to determine specific issue",
+        "risk_level": "Medium",
+        "reason": "Symptoms present but pattern unclear",
+        "care_steps": [
+            "Monitor animal closely",
+            "Note any new symptoms",
+            "Keep animal comfortable"
+        ],
+        "vet_urgency": "Call vet for proper examination"
+    }
+]
+
+def _diagnosis_names(disease_rules):
+    """{lowercase name: disease} for the diseases a rule predicts, also without the parenthetical"""
+    names = {}
+    for rule in disease_rules:
+        # The catch-all rule is not a diagnosis
+        if rule["when"]:
+            disease = rule["disease"]
+            names[disease.lower()] = disease
+            names.setdefault(disease.split(" (")[0].lower(), disease)
+    return names
+
+DIAGNOSIS_NAMES = _diagnosis_names(DISEASE_RULES)
+
+def known_disease(diagnosis):
+    """Disease a free-text vet diagnosis names, or None if it is not one disease_tool predicts"""
+    if not isinstance(diagnosis, str):
+        return None
+    return DIAGNOSIS_NAMES.get(" ".join(diagnosis.split()).lower())
+
+class FrozenRecord(dict):
+    """Read-only dict shared by every request that gets it
+    
+    Serializes like a plain dict; use dict(record) for a mutable copy.
+    """
+    
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Decision records are shared and read-only - copy with dict(record)")
+    
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+    
+    def __reduce__(self):
+        return (FrozenRecord, (dict(self),))
+
+def _freeze(value):
+    return tuple(value) if isinstance(value, list) else value
+
+# Code 0 is unknown; the states of each field follow in order
+STATE_CODES = {
+    field: {state: code for code, state in enumerate(states, 1)}
+    for field, states in SYMPTOM_STATES.items()
+}
+SHAPE = tuple(len(SYMPTOM_STATES[field]) + 1 for field in SYMPTOM_FIELDS)
+NUM_STATES = int(np.prod(SHAPE))
+NUM_SIGN_MASKS = 2 ** len(VISION_SIGNS)
+
+# Row-major strides, so a state index matches np.ravel_multi_index(codes, SHAPE)
+_STRIDES = [int(np.prod(SHAPE[i + 1:])) for i in range(len(SHAPE))]
+_ENCODERS = [(field, STATE_CODES[field], stride) for field, stride in zip(SYMPTOM_FIELDS, _STRIDES)]
+
+def _matches(condition, values, signs):
+    """Whether one condition (a dict) holds for a symptom state"""
+    for key, allowed in condition.items():
+        if key == "known":
+            known = sum(value != "unknown" for value in values.values())
+            if not allowed[0] <= known <= allowed[1]:
+                return False
+        elif key == "missing":
+            if not any(values[field] == "unknown" for field in allowed):
+                return False
+        elif key == "signs":
+            if not any(sign in signs for sign in allowed):
+                return False
+        elif values[key] not in allowed:
+            return False
+    return True
+
+def _first_match(rules, values, signs=()):
+    for rule in rules:
+        when = rule["when"]
+        if any(_matches(condition, values, signs) for condition in (when if isinstance(when, list) else [when])):
+            return rule
+    raise ValueError(f"No rule matches {values} - the last rule should match everything")
+
+def _decision_record(rule, values):
+    known = [field for field in SYMPTOM_FIELDS if values[field] != "unknown"]
+    missing = [field for field in SYMPTOM_FIELDS if values[field] == "unknown"]
+    candidates = missing[:rule["ask_within"]] if rule.get("ask_within") else missing
+    questions = [QUESTIONS[field] for field in rule.get("ask", ()) if field in candidates]
+    return FrozenRecord(
+        action=rule["action"],
+        missing_fields=tuple(missing[:rule.get("missing_fields", 0)]),
+        follow_up_questions=tuple(questions[:rule.get("max_questions", 0)]),
+        confidence_note=rule["note"].format(known=len(known))
+    )
+
+def _prediction_record(rule):
+    return FrozenRecord({key: _freeze(value) for key, value in rule.items() if key != "when"})
+
+def compile_tables(decision_rules=DECISION_RULES, disease_rules=DISEASE_RULES):
+    """Evaluate the rules for every symptom state (and vision sign combination)
+    
+    Returns (decision records, decision ids per state, prediction records,
+    prediction ids per state and sign mask); equal records are shared.
+    """
+    decisions, decision_ids = [], np.zeros(SHAPE, dtype=np.int16)
+    predictions, prediction_ids = [], np.zeros(SHAPE + (NUM_SIGN_MASKS,), dtype=np.int16)
+    interned = {}
+    
+    def intern(records, record):
+        key = (id(records), repr(sorted(record.items())))
+        if key not in interned:
+            interned[key] = len(records)
+            records.append(record)
+        return interned[key]
+    
+    for codes in itertools.product(*(range(size) for size in SHAPE)):
+        values = {
+            field: SYMPTOM_STATES[field][code - 1] if code else "unknown"
+            for field, code in zip(SYMPTOM_FIELDS, codes)
+        }
+        decision_ids[codes] = intern(decisions, _decision_record(_first_match(decision_rules, values), values))
+        for mask in range(NUM_SIGN_MASKS):
+            signs = [sign for bit, sign in enumerate(VISION_SIGNS) if mask >> bit & 1]
+            rule = _first_match(disease_rules, values, signs)
+            prediction_ids[codes + (mask,)] = intern(predictions, _prediction_record(rule))
+    
+    return tuple(decisions), decision_ids, tuple(predictions), prediction_ids
+
+DECISION_RECORDS, DECISION_IDS, PREDICTION_RECORDS, PREDICTION_IDS = compile_tables()
+
+# Flat per-state records for single lookups (no NumPy scalar overhead)
+_DECISIONS = tuple(DECISION_RECORDS[i] for i in DECISION_IDS.ravel())
+_PREDICTIONS = tuple(PREDICTION_RECORDS[i] for i in PREDICTION_IDS.ravel())
+
+def encode_state(symptoms):
+    """Index of a symptom dict in the state space"""
+    index = 0
+    for field, codes, stride in _ENCODERS:
+        index += codes.get(symptoms.get(field), 0) * stride
+    return index
+
+def encode_signs(vision_result):
+    """Bit mask of the rule-relevant vision signs"""
+    signs = (vision_result or {}).get("disease_signs") or ()
+    mask = 0
+    for bit, sign in enumerate(VISION_SIGNS):
+        if sign in signs:
+            mask |= 1 << bit
+    return mask
+
+def decide(symptoms):
+    """Orchestrator decision record for a symptom dict"""
+    return _DECISIONS[encode_state(symptoms)]
+
+def predict(symptoms, vision_result=None):
+    """Rule-based prediction record for a symptom dict and vision result"""
+    return _PREDICTIONS[encode_state(symptoms) * NUM_SIGN_MASKS + encode_signs(vision_result)]
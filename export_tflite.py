@@ -0,0 +1,162 @@
+"""
+TFLite Export Script for Cattle Breed Recognition
+Produces dynamic-range and full-int8 quantized models plus an accuracy-delta report
+"""
+
+import tensorflow as tf
+import numpy as np
+import argparse
+import json
+import os
+import random
+
+from image_processing import ImageProcessor
+from model import CattleBreedClassifier
+
+KERAS_MODEL_PATH = 'models/cattle_breed_model.h5'
+DYNAMIC_MODEL_PATH = 'models/cattle_breed_model_dynamic.tflite'
+INT8_MODEL_PATH = 'models/cattle_breed_model_int8.tflite'
+REPORT_PATH = 'models/quantization_report.json'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def load_labelled_images(data_dir, breed_names, limit=None, seed=42):
+    """List (path, label) pairs from data_dir/{breed}/ folders"""
+    samples = []
+    for label, breed in enumerate(breed_names):
+        breed_dir = os.path.join(data_dir, breed)
+        if not os.path.isdir(breed_dir):
+            continue
+        for filename in sorted(os.listdir(breed_dir)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                samples.append((os.path.join(breed_dir, filename), label))
+    
+    random.Random(seed).shuffle(samples)
+    return samples[:limit] if limit else samples
+
+def preprocess_samples(samples):
+    """Run the serving preprocessing pipeline over sample images"""
+    processor = ImageProcessor()
+    images, labels = [], []
+    for path, label in samples:
+        try:
+            images.append(processor.preprocess_image(path))
+            labels.append(label)
+        except Exception as e:
+            print(f"Skipping {path}: {str(e)}")
+    return np.array(images, dtype=np.float32), np.array(labels)
+
+def export_dynamic_range(model, output_path):
+    """Weights stored as int8, activations computed in float"""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    print(f"Dynamic-range model saved to {output_path}")
+
+def export_full_int8(model, calibration_images, output_path):
+    """Weights and activations int8, calibrated on real training images"""
+    def representative_dataset():
+        for image in calibration_images:
+            yield [np.expand_dims(image, axis=0)]
+    
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    print(f"Full-int8 model saved to {output_path}")
+
+def evaluate(classifier, images, labels, reference=None):
+    """Top-1 accuracy, plus agreement with the float model's probabilities"""
+    probabilities = classifier.predict_probabilities(images)
+    predicted = np.argmax(probabilities, axis=1)
+    
+    result = {
+        'top1_accuracy': round(float(np.mean(predicted == labels)) * 100, 2) if len(labels) else None
+    }
+    
+    if reference is not None:
+        result['top1_agreement'] = round(float(np.mean(predicted == np.argmax(reference, axis=1))) * 100, 2)
+        result['mean_abs_prob_delta'] = round(float(np.mean(np.abs(probabilities - reference))), 5)
+        result['max_abs_prob_delta'] = round(float(np.max(np.abs(probabilities - reference))), 5)
+    
+    return result, probabilities
+
+def export_models(calibration_dir='data/train', eval_dir='data/validation',
+                  calibration_samples=200, eval_samples=None, num_threads=None):
+    """Export both quantized models and write the accuracy-delta report"""
+    if not os.path.exists(KERAS_MODEL_PATH):
+        print(f"Model file not found: {KERAS_MODEL_PATH}")
+        return
+    
+    float_classifier = CattleBreedClassifier(KERAS_MODEL_PATH)
+    breed_names = float_classifier.breed_names
+    
+    calibration = load_labelled_images(calibration_dir, breed_names, limit=calibration_samples)
+    if not calibration:
+        print(f"No calibration images found in {calibration_dir}/{{breed_name}}/")
+        return
+    calibration_images, _ = preprocess_samples(calibration)
+    print(f"Calibrating int8 model on {len(calibration_images)} images")
+    
+    export_dynamic_range(float_classifier.model, DYNAMIC_MODEL_PATH)
+    export_full_int8(float_classifier.model, calibration_images, INT8_MODEL_PATH)
+    
+    # Fall back to the training folders when there is no separate validation split
+    if not load_labelled_images(eval_dir, breed_names, limit=1):
+        eval_dir = calibration_dir
+    eval_images, eval_labels = preprocess_samples(load_labelled_images(eval_dir, breed_names, limit=eval_samples))
+    print(f"Evaluating on {len(eval_images)} images from {eval_dir}")
+    
+    float_metrics, reference = evaluate(float_classifier, eval_images, eval_labels)
+    report = {
+        'eval_dir': eval_dir,
+        'eval_images': int(len(eval_images)),
+        'calibration_images': int(len(calibration_images)),
+        'models': {
+            'float32': {
+                'path': KERAS_MODEL_PATH,
+                'size_mb': round(os.path.getsize(KERAS_MODEL_PATH) / (1024 * 1024), 2),
+                **float_metrics
+            }
+        }
+    }
+    
+    for name, path in [('dynamic_range', DYNAMIC_MODEL_PATH), ('full_int8', INT8_MODEL_PATH)]:
+        classifier = CattleBreedClassifier(path, backend='tflite', num_threads=num_threads)
+        metrics, _ = evaluate(classifier, eval_images, eval_labels, reference)
+        if float_metrics['top1_accuracy'] is not None:
+            metrics['accuracy_delta'] = round(metrics['top1_accuracy'] - float_metrics['top1_accuracy'], 2)
+        report['models'][name] = {
+            'path': path,
+            'size_mb': round(os.path.getsize(path) / (1024 * 1024), 2),
+            **metrics
+        }
+    
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    
+    print(json.dumps(report['models'], indent=2))
+    print(f"Quantization report saved to {REPORT_PATH}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export quantized TFLite breed models')
+    parser.add_argument('--calibration-dir', default='data/train')
+    parser.add_argument('--eval-dir', default='data/validation')
+    parser.add_argument('--calibration-samples', type=int, default=200)
+    parser.add_argument('--eval-samples', type=int, default=None)
+    parser.add_argument('--threads', type=int, default=None, help='TFLite interpreter threads')
+    args = parser.parse_args()
+    
+    export_models(
+        calibration_dir=args.calibration_dir,
+        eval_dir=args.eval_dir,
+        calibration_samples=args.calibration_samples,
+        eval_samples=args.eval_samples,
+        num_threads=args.threads
+    )
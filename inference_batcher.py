@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Dynamic Micro-Batching for Breed Inference
+Coalesces concurrent prediction requests into a single model call
+"""
+
+import threading
+import queue
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+import numpy as np
+
+# Default batching knobs
+DEFAULT_MAX_BATCH_SIZE = 16
+DEFAULT_MAX_WAIT_MS = 5
+
+class InferenceBatcher:
+    """Batching scheduler in front of CattleBreedClassifier
+    
+    Requests that arrive within max_wait_ms of the first queued request are
+    stacked into one (N, 224, 224, 3) tensor (N <= max_batch_size) and run
+    through the model together. Each caller gets back its own result dict.
+    """
+    
+    def __init__(self, classifier, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.classifier = classifier
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._stopped = False
+    
+    def start(self):
+        """Start the background batching thread"""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stopped = False
+                self._worker = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+                self._worker.start()
+    
+    def stop(self):
+        """Stop the batching thread after the queued requests are served"""
+        with self._lock:
+            if self._worker is None:
+                return
+            self._stopped = True
+            self._queue.put(None)
+            worker = self._worker
+            self._worker = None
+        worker.join()
+    
+    def predict(self, image, timeout=None):
+        """Queue a preprocessed (224, 224, 3) image and wait for its prediction"""
+        # Dummy predictions need no model call, so there is nothing to batch
+        if self.classifier.model is None or self._stopped:
+            return self.classifier.predict(image)
+        
+        if len(image.shape) == 4:
+            image = image[0]
+        
+        self.start()
+        future = Future()
+        self._queue.put((image, future))
+        return future.result(timeout)
+    
+    def _collect_batch(self, first):
+        """Gather requests until the batch is full or the wait window closes"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            if item is None:
+                # Stop requested - serve what we have, then exit
+                self._queue.put(None)
+                break
+            batch.append(item)
+        
+        return batch
+    
+    def _run(self):
+        """Worker loop - one model call per collected batch"""
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            
+            batch = self._collect_batch(first)
+            futures = [future for _, future in batch]
+            
+            try:
+                images = np.stack([image for image, _ in batch]).astype(np.float32, copy=False)
+                predictions = self.classifier.predict_probabilities(images)
+                
+                for future, result in zip(futures, self.classifier.format_predictions(predictions)):
+                    future.set_result(result)
+            
+            except Exception as e:
+                error = {
+                    'success': False,
+                    'error': str(e),
+                    'timestamp': datetime.now().isoformat()
+                }
+                for future in futures:
+                    if not future.done():
+                        future.set_result(dict(error))
@@ -0,0 +1,838 @@
+#!/usr/bin/env python3
+"""
+Segmented Append-Only JSONL Log with Running Counters
+Record counts and per-hour/per-day buckets are updated on append and
+persisted to a sidecar file, so statistics never rescan the log. The log
+rolls into dated segments that are gzipped in the background and dropped
+after the retention period
+"""
+
+import bisect
+import glob
+import gzip
+import io
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+# Persist the sidecar after this many appends (and on close)
+META_EVERY = 100
+
+# Hourly and daily buckets kept in the sidecar (the most recent ones)
+HOURLY_RETENTION = 7 * 24
+DAILY_RETENTION = 90
+
+# Block size for reading a log backwards from the end
+READ_BLOCK_SIZE = 64 * 1024
+
+# Closed segments are gzipped as independent members of about this many bytes
+# of whole lines, so a lookup or a page decompresses one block, not the segment
+GZIP_BLOCK_BYTES = 256 * 1024
+
+# Segment policy: roll the active file when the day changes ('day') or only by
+# size ('size'); either way at LOG_SEGMENT_MB. Closed segments are dropped
+# LOG_RETENTION_DAYS after their last record was logged (0 keeps them forever).
+# Both go by the server-side logged_at stamp, never by a record's own timestamp
+SEGMENT_ROLL = os.environ.get('LOG_ROLL', 'day')
+SEGMENT_MAX_BYTES = int(os.environ.get('LOG_SEGMENT_MB', 64)) * 1024 * 1024
+RETENTION_DAYS = int(os.environ.get('LOG_RETENTION_DAYS', 0)) or None
+
+def read_backward(path, end=None, block_size=READ_BLOCK_SIZE):
+    """Yield (offset, line) for the complete lines of a file, newest first
+    
+    Reads fixed-size blocks backwards from end (default: end of file), so
+    fetching the last N records costs O(N) regardless of the file size.
+    """
+    if not os.path.exists(path):
+        return
+    
+    with open(path, 'rb') as f:
+        yield from read_backward_file(f, end, block_size)
+
+def read_backward_file(f, end=None, block_size=READ_BLOCK_SIZE):
+    """read_backward over an open, seekable binary file"""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    position = size if end is None else min(end, size)
+    
+    # A last line without a newline is still being written - skip it
+    partial_end = None
+    if position == size and size:
+        f.seek(size - 1)
+        if f.read(1) != b"\n":
+            partial_end = size
+    
+    remainder = b""
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        block = f.read(read_size) + remainder
+        
+        # The first piece may be cut mid-line - keep it for the next block
+        lines = block.split(b"\n")
+        remainder = lines[0]
+        line_end = position + len(block)
+        for line in reversed(lines[1:]):
+            line_start = line_end - len(line)
+            if line.strip() and line_end != partial_end:
+                yield line_start, line
+            line_end = line_start - 1
+    
+    if remainder.strip() and len(remainder) != partial_end:
+        yield 0, remainder
+
+def _complete_lines(f, position=0):
+    """Yield (offset, line) for the lines of a binary file read from position"""
+    for line in f:
+        if not line.endswith(b"\n"):
+            # Partial trailing write - read it once it is complete
+            break
+        yield position, line
+        position += len(line)
+
+def _timestamp(record, field="timestamp"):
+    timestamp = record.get(field) if isinstance(record, dict) else None
+    return timestamp if isinstance(timestamp, str) else None
+
+def _logged_at(record):
+    return _timestamp(record, "logged_at")
+
+def _widen(low, high, timestamp):
+    """(min, max) extended by a timestamp"""
+    if not timestamp:
+        return low, high
+    return (min(low, timestamp) if low else timestamp), (max(high, timestamp) if high else timestamp)
+
+def _parse(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+def in_range(timestamp, since=None, until=None):
+    """ISO timestamp within [since, until], compared by prefix so a bare date covers the whole day"""
+    if since and (not timestamp or timestamp[:len(since)] < since):
+        return False
+    if until and (not timestamp or timestamp[:len(until)] > until):
+        return False
+    return True
+
+def segment_path(path, seq, compressed=False):
+    """File of a closed segment of the log at path"""
+    return f"{path}.{seq:06d}" + (".gz" if compressed else "")
+
+def block_table_path(compressed_path):
+    """Sidecar listing the (offset, compressed offset) of each gzip block of a segment"""
+    return compressed_path + ".blocks"
+
+def read_block_table(compressed_path):
+    """[(offset, compressed offset)] of the blocks of a compressed segment"""
+    try:
+        with open(block_table_path(compressed_path), 'r') as f:
+            return [tuple(entry) for entry in json.load(f)]
+    except (FileNotFoundError, ValueError):
+        # Compressed as a single gzip member before segments had blocks
+        return [(0, 0)]
+
+def _block_index(blocks, offset):
+    """Index of the block holding an uncompressed offset"""
+    return max(bisect.bisect_right([start for start, _ in blocks], offset) - 1, 0)
+
+def _read_block(f, blocks, index):
+    """(offset, data) of one decompressed block of an open compressed segment"""
+    offset, start = blocks[index]
+    f.seek(start)
+    data = f.read(blocks[index + 1][1] - start) if index + 1 < len(blocks) else f.read()
+    return offset, gzip.decompress(data)
+
+def _read_blocks_backward(f, blocks, end=None):
+    """read_backward_file over a compressed segment, one block at a time"""
+    if end is not None and end <= 0:
+        return
+    last = len(blocks) - 1 if end is None else _block_index(blocks, end - 1)
+    for index in range(last, -1, -1):
+        offset, data = _read_block(f, blocks, index)
+        block_end = end - offset if end is not None and index == last else None
+        for line_offset, line in read_backward_file(io.BytesIO(data), block_end):
+            yield offset + line_offset, line
+
+def _write_blocks(source, target, block_bytes):
+    """Gzip the lines of source into target as one member per block; returns the block table"""
+    blocks, block, size, offset = [], [], 0, 0
+    for line in source:
+        block.append(line)
+        size += len(line)
+        if size >= block_bytes:
+            blocks.append((offset, target.tell()))
+            target.write(gzip.compress(b"".join(block)))
+            offset += size
+            block, size = [], 0
+    if block or not blocks:
+        blocks.append((offset, target.tell()))
+        target.write(gzip.compress(b"".join(block)))
+    return blocks
+
+def segment_files(path):
+    """{seq: compressed} for the closed segment files of the log at path"""
+    found = {}
+    for file_path in glob.glob(glob.escape(path) + ".[0-9]*"):
+        suffix = file_path[len(path) + 1:]
+        compressed = suffix.endswith(".gz")
+        digits = suffix[:-3] if compressed else suffix
+        if digits.isdigit():
+            # The plain file is authoritative until compression finishes
+            seq = int(digits)
+            found[seq] = found.get(seq, True) and compressed
+    return found
+
+def iter_log_records(path):
+    """Yield every complete record of a log, oldest first, without opening it as a JsonlLog
+    
+    Read-only: segments (plain or gzipped) and the active file are read
+    directly and no sidecar is loaded, rebuilt or written, so offline tools
+    can run next to a server that is writing the log. Records appended or
+    rolled over while it runs may be left out.
+    """
+    files = [segment_path(path, seq, compressed) for seq, compressed in sorted(segment_files(path).items())]
+    for file_path in files + [path]:
+        try:
+            f = gzip.open(file_path, 'rb') if file_path.endswith(".gz") else open(file_path, 'rb')
+        except FileNotFoundError:
+            if file_path == path or file_path.endswith(".gz"):
+                # No active file yet, or dropped by retention
+                continue
+            try:
+                # Compressed since the listing
+                f = gzip.open(file_path + ".gz", 'rb')
+            except FileNotFoundError:
+                continue
+        with f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Partial trailing write
+                    break
+                if line.strip():
+                    record = _parse(line)
+                    if record is not None:
+                        yield record
+
+class JsonlLog:
+    """Segmented JSONL log plus incrementally maintained record statistics"""
+    
+    def __init__(self, path, meta_every=META_EVERY, index_key=None, writer=None,
+                 roll=SEGMENT_ROLL, max_bytes=SEGMENT_MAX_BYTES, retention_days=RETENTION_DAYS, compress=True):
+        # Appends go to the active file (path), closed as the next numbered segment
+        # (<path>.000001, later <path>.000001.gz) when the day changes or it would
+        # grow past max_bytes. Record positions are (segment, offset) pairs; the
+        # active file has the next segment number
+        self.path = path
+        self.meta_path = path + ".meta.json"
+        # With index_key, the positions of the first and second record for each key
+        # go to this append-only sidecar, for cursor lookups and duplicate checks
+        self.index_path = path + ".idx"
+        self.meta_every = meta_every
+        self.index_key = index_key
+        # With a log_writer.LogWriter appends are queued; counters and the index
+        # are updated when a batch actually reaches the file
+        self.writer = writer
+        self.roll = roll
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self.compress = compress
+        
+        self._lock = threading.RLock()
+        self._compress_lock = threading.Lock()
+        self._reset_state()
+        
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.load()
+    
+    def _reset_state(self):
+        self.count = 0
+        self.hourly = {}
+        self.daily = {}
+        self._unsaved = 0
+        
+        # Closed segments, oldest first: {seq, first_ts, last_ts (logged_at range),
+        # min_ts, max_ts (record timestamp range), records, bytes, compressed}
+        self.segments = []
+        self.active_seq = 1
+        self.offset = 0
+        self.active_first_ts = None
+        self.active_last_ts = None
+        self.active_min_ts = None
+        self.active_max_ts = None
+        self.active_records = 0
+        
+        self.index = {}
+        self.duplicates = {}
+        self._index_end = (0, 0)
+        
+        # Block tables of compressed segments, read on first use
+        self._blocks = {}
+    
+    def segment_path(self, seq, compressed=False):
+        return segment_path(self.path, seq, compressed)
+    
+    def _segment_file_paths(self, seq):
+        """Every file a closed segment may have on disk"""
+        compressed_path = self.segment_path(seq, compressed=True)
+        return self.segment_path(seq), compressed_path, block_table_path(compressed_path)
+    
+    def _segments_on_disk(self):
+        """{seq: compressed} for the closed segment files present"""
+        return segment_files(self.path)
+    
+    def _count_record(self, record):
+        """Update counters for one record"""
+        self.count += 1
+        timestamp = _timestamp(record)
+        if timestamp and len(timestamp) >= 13:
+            # ISO timestamps: YYYY-MM-DDTHH...
+            for buckets, key, retention in ((self.hourly, timestamp[:13], HOURLY_RETENTION),
+                                            (self.daily, timestamp[:10], DAILY_RETENTION)):
+                buckets[key] = buckets.get(key, 0) + 1
+                if len(buckets) > retention:
+                    del buckets[min(buckets)]
+    
+    def _uncount_record(self, record):
+        """Reverse _count_record for a record that is dropped"""
+        self.count -= 1
+        timestamp = _timestamp(record)
+        if timestamp and len(timestamp) >= 13:
+            for buckets, key in ((self.hourly, timestamp[:13]), (self.daily, timestamp[:10])):
+                if key in buckets:
+                    buckets[key] -= 1
+                    if buckets[key] <= 0:
+                        del buckets[key]
+    
+    def _track_active(self, record):
+        """Record count, logged_at range and timestamp range of the active file"""
+        self.active_records += 1
+        logged_at = _logged_at(record)
+        if logged_at:
+            if self.active_first_ts is None:
+                self.active_first_ts = logged_at
+            self.active_last_ts = logged_at
+        self.active_min_ts, self.active_max_ts = _widen(self.active_min_ts, self.active_max_ts, _timestamp(record))
+    
+    def load(self):
+        """Restore counters from the sidecar and reconcile with the log"""
+        with self._lock:
+            self._reset_state()
+            meta = None
+            if os.path.exists(self.meta_path):
+                try:
+                    with open(self.meta_path, 'r') as f:
+                        meta = json.load(f)
+                    self.count = meta["count"]
+                    self.hourly = meta.get("hourly", {})
+                    self.daily = meta.get("daily", {})
+                    self.segments = meta["segments"]
+                    self.active_seq = meta["active_seq"]
+                    self.offset = meta["offset"]
+                    self.active_first_ts = meta.get("active_first_ts")
+                    self.active_last_ts = meta.get("active_last_ts")
+                    self.active_min_ts = meta["active_min_ts"]
+                    self.active_max_ts = meta.get("active_max_ts")
+                    self.active_records = meta.get("active_records", 0)
+                except (ValueError, KeyError) as e:
+                    # Also sidecars written before the log was segmented, or
+                    # before segments tracked logged_at and timestamps separately
+                    print(f"Rebuilding counters for {self.path}: {str(e)}")
+                    meta = None
+            
+            self._load_index()
+            
+            # The counters are current up to the saved active-file offset: scan only
+            # the bytes after it, which also picks up records appended by other
+            # writers or lost since the last sidecar write. Files that do not match
+            # (truncated, replaced, or a crash mid-roll) are recounted
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            on_disk = self._segments_on_disk()
+            if meta is None or size < self.offset or self._index_end > (self.active_seq, size) \
+                    or set(on_disk) != {segment["seq"] for segment in self.segments}:
+                if meta is not None:
+                    print(f"{self.path} does not match its counters - rebuilding")
+                self._rebuild(on_disk)
+            elif size > self.offset or (self.index_key and self._index_end < (self.active_seq, size)):
+                self._scan_tail()
+                self._save()
+            
+            self._apply_retention()
+        self._compress_closed()
+    
+    def _load_index(self):
+        """Read the position index sidecar"""
+        self.index, self.duplicates, self._index_end = {}, {}, (0, 0)
+        if not self.index_key or not os.path.exists(self.index_path):
+            return
+        
+        with open(self.index_path, 'r') as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                parts = line[:-1].split(" ", 2)
+                if len(parts) < 3 or not parts[1].isdigit():
+                    # Offset-only index from before segmenting - rebuilt from the log
+                    self._clear_index()
+                    return
+                position = (int(parts[0]), int(parts[1]))
+                if parts[2] in self.index:
+                    self.duplicates.setdefault(parts[2], position)
+                else:
+                    self.index[parts[2]] = position
+                self._index_end = (position[0], position[1] + 1)
+    
+    def _clear_index(self):
+        self.index, self.duplicates, self._index_end = {}, {}, (0, 0)
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+    
+    def _index_record(self, record, position, index_file):
+        """Remember where the first (and second) record for a key starts"""
+        key = record.get(self.index_key) if isinstance(record, dict) else None
+        if key is None or str(key) in self.duplicates:
+            return
+        if str(key) in self.index:
+            self.duplicates[str(key)] = position
+        else:
+            self.index[str(key)] = position
+        self._index_end = (position[0], position[1] + 1)
+        index_file.write(f"{position[0]} {position[1]} {key}\n")
+    
+    def _open_segment(self, seq):
+        """(binary file, block table) for a segment, or None if it is gone
+        
+        The block table is None for plain files; a compressed segment is
+        opened raw and read through its blocks.
+        """
+        with self._lock:
+            if seq == self.active_seq:
+                return (open(self.path, 'rb'), None) if os.path.exists(self.path) else None
+            if os.path.exists(self.segment_path(seq)):
+                return open(self.segment_path(seq), 'rb'), None
+            compressed_path = self.segment_path(seq, compressed=True)
+            if os.path.exists(compressed_path):
+                if seq not in self._blocks:
+                    self._blocks[seq] = read_block_table(compressed_path)
+                return open(compressed_path, 'rb'), self._blocks[seq]
+            return None
+    
+    def _iter_lines(self, seq, start=0):
+        """Yield (offset, line) for the complete lines of a segment, oldest first"""
+        opened = self._open_segment(seq)
+        if opened is None:
+            return
+        f, blocks = opened
+        with f:
+            if blocks is None:
+                f.seek(start)
+                yield from _complete_lines(f, start)
+                return
+            # Start at the block holding start; earlier blocks are not decompressed
+            for index in range(_block_index(blocks, start), len(blocks)):
+                offset, data = _read_block(f, blocks, index)
+                for position, line in _complete_lines(io.BytesIO(data), offset):
+                    if position >= start:
+                        yield position, line
+    
+    def _scan_tail(self):
+        """Count (and index) complete records the sidecars do not cover yet"""
+        count_from = (self.active_seq, self.offset)
+        start = min(count_from, self._index_end) if self.index_key else count_from
+        index_file = open(self.index_path, 'a') if self.index_key else None
+        try:
+            for seq in range(start[0], self.active_seq + 1):
+                for offset, line in self._iter_lines(seq, start[1] if seq == start[0] else 0):
+                    if (seq, offset) >= count_from:
+                        self.offset = offset + len(line)
+                    if not line.strip():
+                        continue
+                    record = _parse(line)
+                    if (seq, offset) >= count_from:
+                        self._count_record(record)
+                        self._track_active(record)
+                    if index_file and (seq, offset) >= self._index_end:
+                        self._index_record(record, (seq, offset), index_file)
+        finally:
+            if index_file:
+                index_file.close()
+    
+    def _rebuild(self, on_disk):
+        """Recount every segment and the active file from scratch"""
+        self._reset_state()
+        self._clear_index()
+        for seq in sorted(on_disk):
+            self.segments.append({"seq": seq, "first_ts": None, "last_ts": None, "min_ts": None, "max_ts": None,
+                                  "records": 0, "bytes": 0, "compressed": on_disk[seq]})
+        self.active_seq = max(on_disk) + 1 if on_disk else 1
+        
+        index_file = open(self.index_path, 'a') if self.index_key else None
+        try:
+            for segment in self.segments + [None]:
+                seq = segment["seq"] if segment else self.active_seq
+                for offset, line in self._iter_lines(seq):
+                    if segment:
+                        segment["bytes"] = offset + len(line)
+                    else:
+                        self.offset = offset + len(line)
+                    if not line.strip():
+                        continue
+                    
+                    record = _parse(line)
+                    self._count_record(record)
+                    if index_file:
+                        self._index_record(record, (seq, offset), index_file)
+                    if not segment:
+                        self._track_active(record)
+                        continue
+                    segment["records"] += 1
+                    logged_at = _logged_at(record)
+                    if logged_at:
+                        segment["first_ts"] = segment["first_ts"] or logged_at
+                        segment["last_ts"] = logged_at
+                    segment["min_ts"], segment["max_ts"] = _widen(segment["min_ts"], segment["max_ts"],
+                                                                  _timestamp(record))
+        finally:
+            if index_file:
+                index_file.close()
+        self._save()
+    
+    def append(self, record):
+        """Append one record (stamped with logged_at) and update the counters - O(1)"""
+        # Rolling and retention go by this server-side stamp, as a record's own
+        # timestamp may come from a client; records from before it never expire
+        if isinstance(record, dict):
+            record = dict(record, logged_at=datetime.now().isoformat())
+        if self.writer:
+            self.writer.append(self, record)
+        else:
+            self.write_batch([((json.dumps(record) + "\n").encode(), record)])
+    
+    def _needs_roll(self, first_logged_at, size, logged_at):
+        """Whether a record logged at logged_at, ending the active file at size, starts a new segment"""
+        if self.max_bytes and size > self.max_bytes:
+            return True
+        return bool(self.roll == 'day' and logged_at and first_logged_at
+                    and logged_at[:10] != first_logged_at[:10])
+    
+    def write_batch(self, items, fsync=False):
+        """Append (encoded line, record) pairs with one write per segment touched"""
+        rolled = False
+        with self._lock:
+            run, run_bytes = [], 0
+            first_logged_at = self.active_first_ts
+            for line, record in items:
+                logged_at = _logged_at(record)
+                if (self.active_records or run) and \
+                        self._needs_roll(first_logged_at, self.offset + run_bytes + len(line), logged_at):
+                    if run:
+                        self._write_run(run, fsync)
+                    self._roll()
+                    rolled = True
+                    run, run_bytes, first_logged_at = [], 0, None
+                run.append((line, record))
+                run_bytes += len(line)
+                first_logged_at = first_logged_at or logged_at
+            
+            if run or fsync:
+                self._write_run(run, fsync)
+        
+        if rolled:
+            self._compress_closed()
+    
+    def _write_run(self, items, fsync):
+        """Write records to the active file and account for them (lock held)"""
+        with open(self.path, 'ab') as f:
+            f.write(b"".join(line for line, _ in items))
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        
+        index_file = open(self.index_path, 'a') if self.index_key and items else None
+        try:
+            for line, record in items:
+                if index_file:
+                    self._index_record(record, (self.active_seq, self.offset), index_file)
+                self.offset += len(line)
+                self._count_record(record)
+                self._track_active(record)
+        finally:
+            if index_file:
+                index_file.close()
+        
+        self._unsaved += len(items)
+        if self._unsaved >= self.meta_every:
+            self._save()
+    
+    def _roll(self):
+        """Close the active file as the next numbered segment (lock held)"""
+        os.replace(self.path, self.segment_path(self.active_seq))
+        self.segments.append({
+            "seq": self.active_seq,
+            "first_ts": self.active_first_ts,
+            "last_ts": self.active_last_ts,
+            "min_ts": self.active_min_ts,
+            "max_ts": self.active_max_ts,
+            "records": self.active_records,
+            "bytes": self.offset,
+            "compressed": False
+        })
+        self.active_seq += 1
+        self.offset = 0
+        self.active_first_ts = None
+        self.active_last_ts = None
+        self.active_min_ts = None
+        self.active_max_ts = None
+        self.active_records = 0
+        
+        self._apply_retention()
+        self._save()
+    
+    def _apply_retention(self):
+        """Drop closed segments last logged to before the retention period (lock held)"""
+        if not self.retention_days:
+            return
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        expired = [segment for segment in self.segments if segment["last_ts"] and segment["last_ts"] < cutoff]
+        if not expired:
+            return
+        
+        expired_seqs = {segment["seq"] for segment in expired}
+        for segment in expired:
+            # Buckets go by record timestamps, which need not line up with the
+            # cutoff - take the dropped records out one by one
+            dropped = 0
+            for _, line in self._iter_lines(segment["seq"]):
+                if line.strip():
+                    self._uncount_record(_parse(line))
+                    dropped += 1
+            self.count -= max(segment["records"] - dropped, 0)
+        
+        self.segments = [segment for segment in self.segments if segment["seq"] not in expired_seqs]
+        for segment in expired:
+            self._blocks.pop(segment["seq"], None)
+            for file_path in self._segment_file_paths(segment["seq"]):
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+        
+        if self.index_key:
+            self.index = {key: position for key, position in self.index.items() if position[0] not in expired_seqs}
+            duplicates = {key: position for key, position in self.duplicates.items() if position[0] not in expired_seqs}
+            self.duplicates = {}
+            for key, position in duplicates.items():
+                if key in self.index:
+                    self.duplicates[key] = position
+                else:
+                    # The first record expired - the second is now the only one
+                    self.index[key] = position
+            entries = list(self.index.items()) + list(self.duplicates.items())
+            temp_path = self.index_path + ".tmp"
+            with open(temp_path, 'w') as f:
+                for key, (seq, offset) in sorted(entries, key=lambda item: item[1]):
+                    f.write(f"{seq} {offset} {key}\n")
+            os.replace(temp_path, self.index_path)
+        
+        self._save()
+        print(f"Dropped {len(expired)} expired segment(s) of {self.path}")
+    
+    def _compress_closed(self):
+        """Gzip closed segments in a background thread"""
+        if not self.compress:
+            return
+        with self._lock:
+            pending = [segment["seq"] for segment in self.segments if not segment["compressed"]]
+        if pending:
+            threading.Thread(target=self._compress_segments, args=(pending,),
+                             name='log-compress', daemon=True).start()
+    
+    def _compress_segments(self, seqs):
+        with self._compress_lock:
+            for seq in seqs:
+                plain_path, compressed_path, blocks_path = self._segment_file_paths(seq)
+                temp_path = compressed_path + ".tmp"
+                try:
+                    if not os.path.exists(plain_path):
+                        continue
+                    with open(plain_path, 'rb') as source, open(temp_path, 'wb') as target:
+                        blocks = _write_blocks(source, target, GZIP_BLOCK_BYTES)
+                    
+                    with self._lock:
+                        segment = next((s for s in self.segments if s["seq"] == seq), None)
+                        if segment is None:
+                            # Dropped by retention while compressing
+                            os.remove(temp_path)
+                            continue
+                        # The table goes first, so a .gz on disk always has the right one
+                        with open(blocks_path + ".tmp", 'w') as f:
+                            json.dump(blocks, f)
+                        os.replace(blocks_path + ".tmp", blocks_path)
+                        os.replace(temp_path, compressed_path)
+                        self._blocks[seq] = blocks
+                        segment["compressed"] = True
+                        self._save()
+                        # Readers that already opened the plain file keep their handle
+                        os.remove(plain_path)
+                except OSError as e:
+                    print(f"Failed to compress {plain_path}: {str(e)}")
+    
+    def _save(self):
+        """Write the sidecar atomically (caller holds the lock)"""
+        for buckets, retention in ((self.hourly, HOURLY_RETENTION), (self.daily, DAILY_RETENTION)):
+            if len(buckets) > retention:
+                for period in sorted(buckets)[:-retention]:
+                    del buckets[period]
+        
+        meta = {
+            "count": self.count,
+            "hourly": self.hourly,
+            "daily": self.daily,
+            "segments": self.segments,
+            "active_seq": self.active_seq,
+            "offset": self.offset,
+            "active_first_ts": self.active_first_ts,
+            "active_last_ts": self.active_last_ts,
+            "active_min_ts": self.active_min_ts,
+            "active_max_ts": self.active_max_ts,
+            "active_records": self.active_records
+        }
+        temp_path = self.meta_path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, self.meta_path)
+        self._unsaved = 0
+    
+    def flush(self):
+        """Wait for queued appends to reach the file"""
+        if self.writer:
+            self.writer.flush()
+    
+    def save(self):
+        """Persist the counters now"""
+        self.flush()
+        with self._lock:
+            if os.path.exists(os.path.dirname(self.meta_path) or '.'):
+                self._save()
+    
+    def stats(self):
+        """Record count plus per-day and per-hour breakdowns"""
+        with self._lock:
+            return {
+                "count": self.count,
+                "daily": dict(self.daily),
+                "hourly": dict(self.hourly)
+            }
+    
+    def offset_of(self, key):
+        """(segment, offset) of the first record with this index key, or None"""
+        return self.index.get(str(key))
+    
+    def is_duplicate(self, key):
+        """Whether more than one record has this index key"""
+        return str(key) in self.duplicates
+    
+    def _ranges(self, since=None, until=None):
+        """[(seq, min_ts, max_ts)] of the segments that may hold records in [since, until], oldest first"""
+        with self._lock:
+            ranges = [(segment["seq"], segment["min_ts"], segment["max_ts"]) for segment in self.segments]
+            ranges.append((self.active_seq, self.active_min_ts, self.active_max_ts))
+        return [
+            (seq, min_ts, max_ts) for seq, min_ts, max_ts in ranges
+            if not (since and max_ts and max_ts[:len(since)] < since)
+            and not (until and min_ts and min_ts[:len(until)] > until)
+        ]
+    
+    def iter_records(self, since=None, until=None):
+        """Yield every complete record in [since, until], oldest first
+        
+        Segments entirely outside the range are not opened.
+        """
+        self.flush()
+        for seq, _, _ in self._ranges(since, until):
+            for _, line in self._iter_lines(seq):
+                if line.strip():
+                    record = _parse(line)
+                    if record is not None and (not (since or until) or in_range(_timestamp(record), since, until)):
+                        yield record
+    
+    def records_since(self, cursor):
+        """Records after a (segment, offset) cursor: (records, next cursor, restarted)
+        
+        restarted means the cursor is past the end of the log (it was
+        cleared) and the records start from the beginning.
+        """
+        self.flush()
+        with self._lock:
+            end = (self.active_seq, self.offset)
+        position = tuple(cursor)
+        restarted = position > end
+        if restarted:
+            position = (0, 0)
+        
+        records = []
+        for seq, _, _ in self._ranges():
+            if seq < position[0]:
+                continue
+            start = position[1] if seq == position[0] else 0
+            for offset, line in self._iter_lines(seq, start):
+                position = (seq, offset + len(line))
+                if line.strip():
+                    record = _parse(line)
+                    if record is not None:
+                        records.append(record)
+        return records, list(position), restarted
+    
+    def read_at(self, position):
+        """Record starting at a (segment, offset) position, or None if its segment is gone"""
+        seq, offset = position
+        opened = self._open_segment(seq)
+        if opened is None:
+            return None
+        f, blocks = opened
+        with f:
+            if blocks is None:
+                f.seek(offset)
+                return _parse(f.readline())
+            block_offset, data = _read_block(f, blocks, _block_index(blocks, offset))
+            return _parse(data[offset - block_offset:].split(b"\n", 1)[0])
+    
+    def read_backward(self, end=None, since=None, until=None):
+        """Yield ((segment, offset), record) newest first, starting before end
+        
+        Segments entirely outside [since, until] are skipped without reading.
+        """
+        self.flush()
+        for seq, _, _ in reversed(self._ranges(since, until)):
+            if end is not None and seq > end[0]:
+                continue
+            opened = self._open_segment(seq)
+            if opened is None:
+                continue
+            f, blocks = opened
+            segment_end = end[1] if end is not None and seq == end[0] else None
+            with f:
+                if blocks is None:
+                    lines = read_backward_file(f, segment_end)
+                else:
+                    lines = _read_blocks_backward(f, blocks, segment_end)
+                for offset, line in lines:
+                    record = _parse(line)
+                    if record is not None:
+                        yield (seq, offset), record
+    
+    def clear(self):
+        """Delete the log with all its segments and sidecars"""
+        self.flush()
+        with self._compress_lock, self._lock:
+            for seq in self._segments_on_disk():
+                for file_path in self._segment_file_paths(seq):
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+            for file_path in (self.path, self.meta_path):
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            self._reset_state()
+            self._clear_index()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Learning Data Export - streamed as generators so memory stays flat
+JSON (one document) or columnar JSON lines (typed schema + column chunks)
+"""
+
+import json
+from datetime import datetime
+
+from pattern_table import SYMPTOM_FIELDS
+
+# Records per columnar chunk
+CHUNK_SIZE = 1000
+
+# Response pieces are coalesced to about this many characters before sending
+STREAM_BUFFER_SIZE = 64 * 1024
+
+def _prediction(case):
+    return case.get("disease_prediction") or {}
+
+def _case_feedback(case):
+    return case.get("feedback") or {}
+
+# (column name, type, getter) - one typed column per symptom, prediction and feedback field
+CASE_COLUMNS = [
+    ("case_id", "string", lambda c: c.get("case_id")),
+    ("timestamp", "timestamp", lambda c: c.get("timestamp")),
+] + [
+    (f"symptom_{name}", "category", lambda c, name=name: (c.get("symptoms") or {}).get(name))
+    for name in SYMPTOM_FIELDS
+] + [
+    ("text_input", "string", lambda c: c.get("text_input")),
+    ("disease", "string", lambda c: _prediction(c).get("disease")),
+    ("risk_level", "category", lambda c: _prediction(c).get("risk_level")),
+    ("vet_urgency", "string", lambda c: _prediction(c).get("vet_urgency")),
+    ("learned", "bool", lambda c: bool(_prediction(c).get("learned", False))),
+    ("feedback_rating", "int", lambda c: _case_feedback(c).get("rating")),
+    ("feedback_vet_diagnosis", "string", lambda c: _case_feedback(c).get("vet_diagnosis")),
+    ("feedback_labeled", "bool", lambda c: bool(_case_feedback(c).get("labeled", False)))
+]
+
+FEEDBACK_COLUMNS = [
+    ("case_id", "string", lambda f: f.get("case_id")),
+    ("timestamp", "timestamp", lambda f: f.get("timestamp")),
+    ("rating", "int", lambda f: f.get("rating")),
+    ("actual_diagnosis", "string", lambda f: f.get("actual_diagnosis")),
+    ("predicted_disease", "string", lambda f: f.get("predicted_disease")),
+    ("labeled", "bool", lambda f: bool(f.get("labeled", f.get("actual_diagnosis") is not None)))
+]
+
+def _coerce(value, column_type):
+    """Cast a value to its column type (None stays null)"""
+    if value is None:
+        return None
+    if column_type == "int":
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    if column_type == "bool":
+        return bool(value)
+    return value if isinstance(value, str) else str(value)
+
+def buffered(pieces, size=STREAM_BUFFER_SIZE):
+    """Coalesce small string pieces into larger response chunks"""
+    buffer, length = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+def export_json(learning_system, since=None, until=None):
+    """One JSON document: patterns, statistics, then the cases and feedback in [since, until]"""
+    yield '{"exported_at": ' + json.dumps(datetime.now().isoformat())
+    yield ',\n"patterns": ' + json.dumps(learning_system.patterns)
+    yield ',\n"statistics": ' + json.dumps(learning_system.get_statistics())
+    
+    for name, records in (("cases", learning_system.storage.iter_cases(since, until)),
+                          ("feedback", learning_system.storage.iter_feedback(since, until))):
+        yield ',\n"' + name + '": ['
+        separator = '\n'
+        for record in records:
+            yield separator + json.dumps(record)
+            separator = ',\n'
+        yield '\n]'
+    
+    yield '}\n'
+
+def _columnar_table(table, columns, records, chunk_size):
+    """Schema line, then one line of column arrays per chunk of records"""
+    yield json.dumps({
+        "type": "schema",
+        "table": table,
+        "columns": [{"name": name, "type": column_type} for name, column_type, _ in columns]
+    }) + "\n"
+    
+    chunk = []
+    total = 0
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield _columnar_chunk(table, columns, chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        yield _columnar_chunk(table, columns, chunk)
+        total += len(chunk)
+    
+    yield json.dumps({"type": "end", "table": table, "rows": total}) + "\n"
+
+def _columnar_chunk(table, columns, records):
+    return json.dumps({
+        "type": "chunk",
+        "table": table,
+        "rows": len(records),
+        "columns": {
+            name: [_coerce(getter(record), column_type) for record in records]
+            for name, column_type, getter in columns
+        }
+    }) + "\n"
+
+def export_columnar(learning_system, chunk_size=CHUNK_SIZE, since=None, until=None):
+    """Columnar JSON lines: metadata, then typed cases and feedback tables for [since, until]"""
+    yield json.dumps({
+        "type": "metadata",
+        "exported_at": datetime.now().isoformat(),
+        "patterns": learning_system.patterns,
+        "statistics": learning_system.get_statistics()
+    }) + "\n"
+    yield from _columnar_table("cases", CASE_COLUMNS, learning_system.storage.iter_cases(since, until), chunk_size)
+    yield from _columnar_table("feedback", FEEDBACK_COLUMNS, learning_system.storage.iter_feedback(since, until), chunk_size)
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Learning Data Storage - pluggable backends for cases, feedback and breed feedback
+JSONL files (default) or an embedded SQLite database in WAL mode
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+
+from jsonl_log import JsonlLog
+
+# Hourly and daily buckets reported by the SQLite backend (the JSONL sidecar keeps the same windows)
+HOURLY_RETENTION = 7 * 24
+DAILY_RETENTION = 90
+
+class JsonlStorage:
+    """Segmented append-only JSONL logs with sidecar counters and a case_id position index"""
+    
+    name = 'jsonl'
+    
+    def __init__(self, cases_path, feedback_path, breed_feedback_path, writer=None):
+        self.writer = writer
+        self.cases = JsonlLog(cases_path, index_key="case_id", writer=writer)
+        self.feedback = JsonlLog(feedback_path, writer=writer)
+        self.breed_feedback = JsonlLog(breed_feedback_path, writer=writer)
+    
+    def append_case(self, record):
+        self.cases.append(record)
+    
+    def append_feedback(self, record):
+        self.feedback.append(record)
+    
+    def append_breed_feedback(self, record):
+        self.breed_feedback.append(record)
+    
+    def counts(self):
+        """Record counts - O(1)"""
+        return {"cases": self.cases.count, "feedback": self.feedback.count}
+    
+    def case_buckets(self):
+        """(cases per day, cases per hour) for the most recent days and hours"""
+        stats = self.cases.stats()
+        return stats["daily"], stats["hourly"]
+    
+    def get_case(self, case_id):
+        """First logged record of a case via the position index - O(1)"""
+        position = self.cases.offset_of(case_id)
+        if position is None:
+            # May still be queued in the log writer
+            self.flush()
+            position = self.cases.offset_of(case_id)
+        return self.cases.read_at(position) if position is not None else None
+    
+    def is_ambiguous_case(self, case_id):
+        """Whether more than one written case has this case_id (never waits for the writer)"""
+        # New case ids are unique, so a second record can only be an old one already on disk
+        return self.cases.is_duplicate(case_id)
+    
+    def get_cases(self, limit=20, before=None, disease=None, since=None, until=None):
+        """Newest cases first, read backwards from the end of the case log
+        
+        Segments outside [since, until] are skipped without being read.
+        """
+        end = None
+        if before:
+            end = self.cases.offset_of(before)
+            if end is None:
+                raise KeyError(f"Unknown case_id: {before}")
+        
+        cases = []
+        next_before = None
+        boundary = None
+        for position, case in self.cases.read_backward(end, since=since, until=until):
+            if boundary is not None and position < boundary:
+                break
+            
+            timestamp = case.get("timestamp", "")
+            if until and timestamp[:len(until)] > until:
+                continue
+            if since and timestamp[:len(since)] < since:
+                # Cases are appended in time order - nothing older can match
+                break
+            if disease and (case.get("disease_prediction") or {}).get("disease") != disease:
+                continue
+            
+            cases.append(case)
+            if boundary is None and len(cases) >= limit:
+                # Finish the page at the first record of this case, so the
+                # next page (which starts there) skips nothing
+                next_before = case.get("case_id")
+                boundary = self.cases.offset_of(next_before) if next_before is not None else None
+                if boundary is None or boundary >= position:
+                    break
+        
+        return cases, next_before
+    
+    def iter_cases(self, since=None, until=None):
+        """Every case in [since, until], oldest first (streamed)"""
+        return self.cases.iter_records(since, until)
+    
+    def iter_feedback(self, since=None, until=None):
+        """Every feedback record in [since, until], oldest first (streamed)"""
+        return self.feedback.iter_records(since, until)
+    
+    def breed_feedback_since(self, cursor):
+        """Breed feedback after a [segment, offset] cursor: (records, next cursor, restarted)"""
+        if isinstance(cursor, int):
+            # Byte offset into the single file used before the log was segmented
+            cursor = (1, cursor)
+        return self.breed_feedback.records_since(cursor)
+    
+    def flush(self):
+        if self.writer:
+            self.writer.flush()
+    
+    def clear(self):
+        """Delete all stored records"""
+        self.flush()
+        self.cases.clear()
+        self.feedback.clear()
+        self.breed_feedback.clear()
+    
+    def close(self):
+        """Persist the sidecar counters"""
+        self.cases.save()
+        self.feedback.save()
+        self.breed_feedback.save()
+
+class SqliteTableSink:
+    """LogWriter sink that inserts a batch of records in one transaction"""
+    
+    def __init__(self, storage, table):
+        self.storage = storage
+        self.table = table
+    
+    def write_batch(self, items, fsync=False):
+        self.storage.insert(self.table, [record for _, record in items], checkpoint=fsync)
+
+class SqliteStorage:
+    """Embedded SQLite database in WAL mode
+    
+    Readers use one connection per thread and never block the writer.
+    Record counts and per-day/per-hour case buckets are kept in their own
+    tables, updated in the same transaction as the insert.
+    """
+    
+    name = 'sqlite'
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cases (
+            id INTEGER PRIMARY KEY,
+            case_id TEXT,
+            timestamp TEXT,
+            disease TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_cases_case_id ON cases (case_id);
+        CREATE INDEX IF NOT EXISTS idx_cases_timestamp ON cases (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_cases_disease ON cases (disease);
+        
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY,
+            case_id TEXT,
+            timestamp TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_feedback_case_id ON feedback (case_id);
+        
+        CREATE TABLE IF NOT EXISTS breed_feedback (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT,
+            predicted_breed TEXT,
+            correct_breed TEXT,
+            is_correct INTEGER,
+            confidence REAL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_breed_feedback_timestamp ON breed_feedback (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_breed_feedback_predicted ON breed_feedback (predicted_breed);
+        CREATE INDEX IF NOT EXISTS idx_breed_feedback_correct ON breed_feedback (correct_breed);
+        
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS case_buckets (
+            period TEXT PRIMARY KEY,
+            count INTEGER NOT NULL
+        );
+    """
+    
+    def __init__(self, path, writer=None):
+        self.path = path
+        self.writer = writer
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._writer_conn = self._connect()
+        self._writer_conn.executescript(self.SCHEMA)
+        
+        self.sinks = {table: SqliteTableSink(self, table) for table in ('cases', 'feedback', 'breed_feedback')}
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Commits are durable at the next checkpoint (see insert)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+    
+    def _rows(self, table, records):
+        """Column tuples for a batch of records"""
+        if table == 'cases':
+            return [
+                (r.get("case_id"), r.get("timestamp"),
+                 (r.get("disease_prediction") or {}).get("disease"), json.dumps(r))
+                for r in records
+            ]
+        if table == 'feedback':
+            return [(r.get("case_id"), r.get("timestamp"), json.dumps(r)) for r in records]
+        return [
+            (r.get("timestamp"), r.get("predicted_breed"), r.get("correct_breed"),
+             int(bool(r.get("is_correct"))), r.get("confidence"), json.dumps(r))
+            for r in records
+        ]
+    
+    INSERTS = {
+        'cases': "INSERT INTO cases (case_id, timestamp, disease, data) VALUES (?, ?, ?, ?)",
+        'feedback': "INSERT INTO feedback (case_id, timestamp, data) VALUES (?, ?, ?)",
+        'breed_feedback': "INSERT INTO breed_feedback (timestamp, predicted_breed, correct_breed, is_correct, confidence, data) VALUES (?, ?, ?, ?, ?, ?)"
+    }
+    
+    def insert(self, table, records, checkpoint=False):
+        """Insert a batch of records (plus counter updates) in one transaction"""
+        if not records:
+            if checkpoint:
+                with self._write_lock:
+                    self._writer_conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            return
+        
+        buckets = defaultdict(int)
+        if table == 'cases':
+            for record in records:
+                timestamp = record.get("timestamp")
+                if isinstance(timestamp, str) and len(timestamp) >= 13:
+                    buckets[timestamp[:10]] += 1
+                    buckets[timestamp[:13]] += 1
+        
+        upsert = "INSERT INTO {} VALUES (?, ?) ON CONFLICT({}) DO UPDATE SET {} = {} + excluded.{}"
+        with self._write_lock:
+            with self._writer_conn:
+                self._writer_conn.executemany(self.INSERTS[table], self._rows(table, records))
+                self._writer_conn.execute(upsert.format('counters', 'name', 'value', 'value', 'value'),
+                                          (table, len(records)))
+                self._writer_conn.executemany(upsert.format('case_buckets', 'period', 'count', 'count', 'count'),
+                                              list(buckets.items()))
+            if checkpoint:
+                self._writer_conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    
+    def _append(self, table, record):
+        if self.writer:
+            self.writer.append(self.sinks[table], record)
+        else:
+            self.insert(table, [record])
+    
+    def append_case(self, record):
+        self._append('cases', record)
+    
+    def append_feedback(self, record):
+        self._append('feedback', record)
+    
+    def append_breed_feedback(self, record):
+        self._append('breed_feedback', record)
+    
+    def counts(self):
+        """Record counts - one primary-key lookup per table"""
+        rows = dict(self._reader().execute("SELECT name, value FROM counters").fetchall())
+        return {"cases": rows.get('cases', 0), "feedback": rows.get('feedback', 0)}
+    
+    def case_buckets(self):
+        """(cases per day, cases per hour) for the most recent days and hours"""
+        conn = self._reader()
+        daily = conn.execute(
+            "SELECT period, count FROM case_buckets WHERE length(period) = 10 ORDER BY period DESC LIMIT ?",
+            (DAILY_RETENTION,)
+        ).fetchall()
+        hourly = conn.execute(
+            "SELECT period, count FROM case_buckets WHERE length(period) = 13 ORDER BY period DESC LIMIT ?",
+            (HOURLY_RETENTION,)
+        ).fetchall()
+        return dict(reversed(daily)), dict(reversed(hourly))
+    
+    def _first_case_row(self, case_id):
+        row = self._reader().execute("SELECT MIN(id) FROM cases WHERE case_id = ?", (case_id,)).fetchone()
+        return row[0] if row else None
+    
+    def get_case(self, case_id):
+        """First logged record of a case via the case_id index"""
+        query = "SELECT data FROM cases WHERE case_id = ? ORDER BY id LIMIT 1"
+        row = self._reader().execute(query, (case_id,)).fetchone()
+        if row is None:
+            self.flush()
+            row = self._reader().execute(query, (case_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def is_ambiguous_case(self, case_id):
+        """Whether more than one written case has this case_id (never waits for the writer)"""
+        row = self._reader().execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM cases WHERE case_id = ? LIMIT 2)", (case_id,)
+        ).fetchone()
+        return row[0] > 1
+    
+    def get_cases(self, limit=20, before=None, disease=None, since=None, until=None):
+        """Newest cases first, paged by case_id cursor (same semantics as the JSONL backend)"""
+        self.flush()
+        
+        conditions, params = [], []
+        if before:
+            end = self._first_case_row(before)
+            if end is None:
+                raise KeyError(f"Unknown case_id: {before}")
+            conditions.append("id < ?")
+            params.append(end)
+        if disease:
+            conditions.append("disease = ?")
+            params.append(disease)
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            conditions.append("substr(timestamp, 1, ?) <= ?")
+            params.extend([len(until), until])
+        
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        rows = self._reader().execute(
+            f"SELECT id, case_id, data FROM cases {where} ORDER BY id DESC LIMIT ?", params + [limit]
+        ).fetchall()
+        
+        next_before = None
+        if len(rows) == limit:
+            # Extend the page back to the first record of the last case
+            last_id, next_before = rows[-1][0], rows[-1][1]
+            boundary = self._first_case_row(next_before) if next_before is not None else None
+            if boundary is not None and boundary < last_id:
+                rows += self._reader().execute(
+                    f"SELECT id, case_id, data FROM cases {where} {'AND' if where else 'WHERE'} id >= ? AND id < ? ORDER BY id DESC",
+                    params + [boundary, last_id]
+                ).fetchall()
+        
+        return [json.loads(data) for _, _, data in rows], next_before
+    
+    def _iter_table(self, table, since=None, until=None, chunk_size=1000):
+        self.flush()
+        conditions, params = [], []
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            conditions.append("substr(timestamp, 1, ?) <= ?")
+            params.extend([len(until), until])
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        
+        # One statement reads one WAL snapshot - appends made meanwhile are not included
+        cursor = self._reader().execute(f"SELECT data FROM {table} {where} ORDER BY id", params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            for (data,) in rows:
+                yield json.loads(data)
+    
+    def iter_cases(self, since=None, until=None):
+        """Every case in [since, until], oldest first (streamed)"""
+        return self._iter_table('cases', since, until)
+    
+    def iter_feedback(self, since=None, until=None):
+        """Every feedback record in [since, until], oldest first (streamed)"""
+        return self._iter_table('feedback', since, until)
+    
+    def breed_feedback_since(self, cursor):
+        """Breed feedback after a row id: (records, last row id, restarted)"""
+        self.flush()
+        conn = self._reader()
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM breed_feedback").fetchone()[0]
+        restarted = last_id < cursor
+        if restarted:
+            cursor = 0
+        
+        rows = conn.execute(
+            "SELECT id, data FROM breed_feedback WHERE id > ? AND id <= ? ORDER BY id", (cursor, last_id)
+        ).fetchall()
+        return [json.loads(data) for _, data in rows], last_id, restarted
+    
+    def flush(self):
+        if self.writer:
+            self.writer.flush()
+    
+    def clear(self):
+        """Delete all stored records"""
+        self.flush()
+        with self._write_lock, self._writer_conn:
+            for table in ('cases', 'feedback', 'breed_feedback', 'counters', 'case_buckets'):
+                self._writer_conn.execute(f"DELETE FROM {table}")
+    
+    def close(self):
+        self.flush()
+        with self._write_lock:
+            self._writer_conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+STORAGE_BACKENDS = ('jsonl', 'sqlite')
+
+def create_storage(backend, cases_path, feedback_path, breed_feedback_path, db_path, writer=None):
+    """Build the configured storage backend"""
+    if backend == 'sqlite':
+        return SqliteStorage(db_path, writer=writer)
+    if backend == 'jsonl':
+        return JsonlStorage(cases_path, feedback_path, breed_feedback_path, writer=writer)
+    raise ValueError(f"Unknown learning storage backend: {backend} (expected one of {STORAGE_BACKENDS})")
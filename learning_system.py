@@ -3,49 +3,102 @@
 Self-Learning System - Learns from every interaction
 """
 
-import json
+import atexit
 import os
 from datetime import datetime
-from collections import defaultdict
+
+from breed_analytics import BreedFeedbackAggregator
+from decision_table import FrozenRecord
+from learning_storage import create_storage
+from log_writer import log_writer
+from pattern_store import PatternStore
+from pattern_table import PatternTable, encode_symptoms, pattern_key_to_mask, ACTIVE_COUNTS, NUM_PATTERNS
 
 CASES_FILE = "learning_data/cases.jsonl"
 PATTERNS_FILE = "learning_data/patterns.json"
 FEEDBACK_FILE = "learning_data/feedback.jsonl"
+BREED_FEEDBACK_FILE = "learning_data/breed_feedback.jsonl"
+BREED_ANALYTICS_FILE = "learning_data/breed_analytics.json"
+
+# Storage backend for cases and feedback: jsonl or sqlite
+STORAGE_BACKEND = os.environ.get('LEARNING_STORAGE', 'jsonl')
+LEARNING_DB = os.environ.get('LEARNING_DB', 'learning_data/learning.db')
 
 os.makedirs("learning_data", exist_ok=True)
 
+def apply_pattern_delta(table, delta):
+    """Apply one logged update to the pattern table (also used for log replay)"""
+    if delta["op"] == "case":
+        # Older log lines carry the "+"-joined pattern key instead of the mask
+        mask = delta["mask"] if "mask" in delta else pattern_key_to_mask(delta["pattern"])
+        if mask is not None:
+            table.add_case(mask, delta.get("disease"))
+    
+    elif delta["op"] == "feedback":
+        table.add_feedback(delta.get("diagnosis"), delta.get("rating"), delta.get("mask"), delta.get("predicted"))
+
 class SelfLearningSystem:
     """Self-learning system that improves from every case"""
     
     def __init__(self):
-        self.patterns = self.load_patterns()
+        # Updates go to a delta log; patterns.json is rewritten by a background snapshot
+        self.store = PatternStore(PATTERNS_FILE, PatternTable, apply_pattern_delta,
+                                  from_json=PatternTable.from_json, to_json=PatternTable.to_json)
+        self.store.start()
+        atexit.register(self.store.close)
+    
+        # Cases and feedback records; appends are queued to the background log writer
+        self.storage = create_storage(STORAGE_BACKEND, CASES_FILE, FEEDBACK_FILE, BREED_FEEDBACK_FILE,
+                                      LEARNING_DB, writer=log_writer)
+        atexit.register(self.storage.close)
+    
+        # Breed feedback aggregates, updated from new feedback only
+        self.breed_analytics = BreedFeedbackAggregator(self.storage, BREED_ANALYTICS_FILE)
+        
+        # (table lookup result, learned-prediction record) per symptom pattern
+        self._learned_records = [None] * NUM_PATTERNS
+    
+    @property
+    def table(self):
+        """Current learned-pattern table"""
+        return self.store.state
+    
+    @property
+    def patterns(self):
+        """Learned patterns in the patterns.json shape (for export and admin views)"""
+        return self.table.to_json()
     
     def load_patterns(self):
-        """Load learned patterns"""
-        if os.path.exists(PATTERNS_FILE):
-            with open(PATTERNS_FILE, 'r') as f:
-                return json.load(f)
-        return {
-            "symptom_disease_map": {},
-            "accuracy_scores": {},
-            "common_patterns": [],
-            "question_effectiveness": {}
-        }
+        """Load learned patterns (last snapshot plus the delta log tail)"""
+        return self.store.load()
     
     def save_patterns(self):
-        """Save learned patterns"""
-        with open(PATTERNS_FILE, 'w') as f:
-            json.dump(self.patterns, f, indent=2)
+        """Snapshot learned patterns to patterns.json"""
+        self.store.snapshot()
+    
+    def flush(self):
+        """Wait until queued case and feedback records are stored"""
+        self.storage.flush()
+    
+    def clear(self):
+        """Delete all cases, feedback and learned patterns"""
+        self.storage.clear()
+        self.store.reset()
+        self.breed_analytics.reset()
     
-    def log_case(self, case_data):
-        """Log every case for learning"""
+    def log_case(self, case_data, learn=True):
+        """Log every case for learning
+        
+        With learn=False the case is only stored; call learn_from_case later
+        (health checks do so after the response is sent).
+        """
         case_data["timestamp"] = datetime.now().isoformat()
         
-        with open(CASES_FILE, 'a') as f:
-            f.write(json.dumps(case_data) + "\n")
+        self.storage.append_case(case_data)
         
         # Learn from this case
-        self._learn_from_case(case_data)
+        if learn:
+            self.learn_from_case(case_data)
     
     def log_feedback(self, case_id, feedback_data):
         """Log user feedback"""
@@ -55,103 +108,115 @@ class SelfLearningSystem:
             **feedback_data
         }
         
-        with open(FEEDBACK_FILE, 'a') as f:
-            f.write(json.dumps(feedback) + "\n")
+        # Join with the original case through the case_id index - not when
+        # several cases share the id (ids from before they were unique), as
+        # the feedback could then be learned for the wrong symptom pattern
+        case = self.storage.get_case(case_id) if case_id else None
+        if case and self.storage.is_ambiguous_case(case_id):
+            print(f"Case id {case_id} is not unique - feedback not joined to a case")
+            case = None
+        if case and not feedback.get("predicted_disease"):
+            feedback["predicted_disease"] = (case.get("disease_prediction") or {}).get("disease")
+        
+        self.storage.append_feedback(feedback)
         
         # Learn from feedback
-        self._learn_from_feedback(feedback)
+        self._learn_from_feedback(feedback, case)
     
-    def _learn_from_case(self, case):
+    def learn_from_case(self, case):
         """Extract patterns from case"""
         symptoms = case.get("symptoms", {})
-        prediction = case.get("disease_prediction", {})
-        
-        # Build symptom pattern key
-        active_symptoms = [k for k, v in symptoms.items() if v in ["yes", "stopped", "low"]]
-        pattern_key = "+".join(sorted(active_symptoms))
+        prediction = case.get("disease_prediction") or {}
         
-        if pattern_key and prediction.get("disease"):
-            # Track symptom-disease correlation
-            if pattern_key not in self.patterns["symptom_disease_map"]:
-                self.patterns["symptom_disease_map"][pattern_key] = {}
-            
-            disease = prediction["disease"]
-            if disease not in self.patterns["symptom_disease_map"][pattern_key]:
-                self.patterns["symptom_disease_map"][pattern_key][disease] = 0
-            
-            self.patterns["symptom_disease_map"][pattern_key][disease] += 1
+        mask = encode_symptoms(symptoms)
         
-        # Track common patterns
-        if len(active_symptoms) >= 2:
-            if pattern_key not in [p["pattern"] for p in self.patterns["common_patterns"]]:
-                self.patterns["common_patterns"].append({
-                    "pattern": pattern_key,
-                    "count": 1,
-                    "diseases": [prediction.get("disease")]
-                })
-            else:
-                for p in self.patterns["common_patterns"]:
-                    if p["pattern"] == pattern_key:
-                        p["count"] += 1
-                        if prediction.get("disease") not in p["diseases"]:
-                            p["diseases"].append(prediction.get("disease"))
-        
-        self.save_patterns()
+        # Only log cases that change the learned state
+        if (mask and prediction.get("disease")) or ACTIVE_COUNTS[mask] >= 2:
+            self.store.update({
+                "op": "case",
+                "mask": mask,
+                "disease": prediction.get("disease")
+            })
     
-    def _learn_from_feedback(self, feedback):
-        """Learn from user feedback"""
-        case_id = feedback.get("case_id")
+    def _learn_from_feedback(self, feedback, case=None):
+        """Learn from user feedback on a logged case"""
         rating = feedback.get("rating")
         actual_diagnosis = feedback.get("actual_diagnosis")
+        mask = encode_symptoms(case.get("symptoms") or {}) if case else 0
         
-        # Update accuracy scores
-        if actual_diagnosis:
-            if actual_diagnosis not in self.patterns["accuracy_scores"]:
-                self.patterns["accuracy_scores"][actual_diagnosis] = {"correct": 0, "total": 0}
-            
-            self.patterns["accuracy_scores"][actual_diagnosis]["total"] += 1
-            if rating and rating >= 4:
-                self.patterns["accuracy_scores"][actual_diagnosis]["correct"] += 1
-        
-        self.save_patterns()
+        # Accuracy scores, plus pattern accuracy (and the vet's diagnosis)
+        # for the case's symptom pattern
+        if actual_diagnosis or (mask and rating is not None):
+            delta = {
+                "op": "feedback",
+                "diagnosis": actual_diagnosis,
+                "rating": rating
+            }
+            if mask:
+                delta["mask"] = mask
+                delta["predicted"] = feedback.get("predicted_disease")
+            self.store.update(delta)
     
     def get_learned_prediction(self, symptoms):
         """Get prediction based on learned patterns"""
-        active_symptoms = [k for k, v in symptoms.items() if v in ["yes", "stopped", "low"]]
-        pattern_key = "+".join(sorted(active_symptoms))
+        return self.learned_prediction(encode_symptoms(symptoms))
+    
+    def learned_prediction(self, mask):
+        """Most common disease for a symptom pattern, or None - O(1)
         
-        if pattern_key in self.patterns["symptom_disease_map"]:
-            diseases = self.patterns["symptom_disease_map"][pattern_key]
-            # Return most common disease for this pattern
-            most_common = max(diseases.items(), key=lambda x: x[1])
-            return {
-                "disease": most_common[0],
-                "confidence": most_common[1] / sum(diseases.values()),
-                "learned": True,
-                "pattern_matches": most_common[1]
-            }
+        The record is shared and read-only; it is rebuilt only after the
+        pattern's counts change.
+        """
+        match = self.table.lookup(mask)
+        if match is None:
+            return None
         
-        return None
-    
-    def get_statistics(self):
-        """Get learning statistics"""
-        total_cases = 0
-        if os.path.exists(CASES_FILE):
-            with open(CASES_FILE, 'r') as f:
-                total_cases = sum(1 for _ in f)
+        cached = self._learned_records[mask]
+        if cached is None or cached[0] is not match:
+            disease, count, total = match
+            cached = self._learned_records[mask] = (match, FrozenRecord(
+                disease=disease,
+                confidence=count / total,
+                learned=True,
+                pattern_matches=count
+            ))
+        return cached[1]
+    
+    def log_breed_feedback(self, feedback):
+        """Log breed prediction feedback"""
+        self.storage.append_breed_feedback(feedback)
+    
+    def get_cases(self, limit=20, before=None, disease=None, since=None, until=None):
+        """Newest cases first, paged backwards from the newest case
         
-        total_feedback = 0
-        if os.path.exists(FEEDBACK_FILE):
-            with open(FEEDBACK_FILE, 'r') as f:
-                total_feedback = sum(1 for _ in f)
+        before is a case_id cursor (the next_before of the previous page).
+        since/until are ISO dates or timestamps, compared by prefix so a bare
+        date covers the whole day. Returns (cases, next_before).
+        """
+        return self.storage.get_cases(limit=limit, before=before, disease=disease, since=since, until=until)
         
-        return {
-            "total_cases": total_cases,
-            "total_feedback": total_feedback,
-            "learned_patterns": len(self.patterns["symptom_disease_map"]),
-            "common_patterns": len(self.patterns["common_patterns"]),
-            "accuracy_data": self.patterns["accuracy_scores"]
+    def get_breed_feedback_summary(self):
+        """Breed feedback totals and per-breed corrections"""
+        return self.breed_analytics.summary()
+    
+    def get_breed_confusion_matrix(self, include_empty=False):
+        """Breed confusion matrix with per-breed precision and recall"""
+        return self.breed_analytics.confusion_matrix(include_empty=include_empty)
+    
+    def get_statistics(self, buckets=False):
+        """Get learning statistics; buckets adds cases per day and per hour"""
+        counts = self.storage.counts()
+        table = self.table
+        stats = {
+            "total_cases": counts["cases"],
+            "total_feedback": counts["feedback"],
+            "learned_patterns": table.learned_pattern_count(),
+            "common_patterns": len(table.common_order),
+            "accuracy_data": {name: dict(scores) for name, scores in table.accuracy_scores.items()}
         }
+        if buckets:
+            stats["cases_per_day"], stats["cases_per_hour"] = self.storage.case_buckets()
+        return stats
 
 # Global instance
 learning_system = SelfLearningSystem()
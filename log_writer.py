@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Background Log Writer - append-only JSONL logs with group commit
+Request threads only enqueue serialized records; a single writer thread
+appends them in batches, so handlers never block on disk and concurrent
+records never interleave
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+# Records written per group commit at most
+MAX_BATCH = 512
+
+# Bounded queue - producers block (backpressure) instead of growing without limit
+MAX_QUEUE = 10000
+
+# fsync policies: after every batch, at most once per interval, or leave it to the OS
+FSYNC_POLICIES = ('always', 'interval', 'never')
+FSYNC_INTERVAL = 1.0
+
+class FileSink:
+    """Plain append-only JSONL file"""
+    
+    def __init__(self, path):
+        self.path = path
+    
+    def write_batch(self, items, fsync=False):
+        """Append a batch of (line, record) pairs with one write"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(b"".join(line for line, _ in items))
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+
+class LogWriter:
+    """Queue plus dedicated writer thread for every learning log
+    
+    A sink is a file path or any object with write_batch(items, fsync);
+    items are (encoded line, record) pairs in submission order.
+    """
+    
+    def __init__(self, fsync='interval', fsync_interval=FSYNC_INTERVAL, max_batch=MAX_BATCH):
+        self.set_fsync(fsync)
+        self.fsync_interval = fsync_interval
+        self.max_batch = max_batch
+        
+        self._queue = queue.Queue(maxsize=MAX_QUEUE)
+        
+        # Records are numbered as they are queued; flush() waits for the
+        # writer to get past the number current when it was called
+        self._enqueued = 0
+        self._written = 0
+        self._enqueue_lock = threading.Lock()
+        self._progress = threading.Condition()
+        
+        self._sinks = {}
+        self._last_fsync = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+    
+    def set_fsync(self, fsync):
+        """Change the fsync policy; an unknown one raises rather than silently skipping syncs"""
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync!r} (expected one of {', '.join(FSYNC_POLICIES)})")
+        self.fsync = fsync
+    
+    def start(self):
+        """Start the writer thread"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._closed = False
+                self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                self._thread.start()
+    
+    def _sink(self, sink):
+        if isinstance(sink, str):
+            with self._lock:
+                if sink not in self._sinks:
+                    self._sinks[sink] = FileSink(sink)
+                return self._sinks[sink]
+        return sink
+    
+    def append(self, sink, record):
+        """Queue one record for a sink - returns without touching the disk"""
+        line = (json.dumps(record) + "\n").encode()
+        if self._closed:
+            # Late writes during shutdown go straight to disk
+            self._sink(sink).write_batch([(line, record)], fsync=self.fsync == 'always')
+            return
+        
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        sink = self._sink(sink)
+        # Numbered and queued together, so the queue stays in number order
+        with self._enqueue_lock:
+            self._enqueued += 1
+            self._queue.put((sink, line, record, self._enqueued))
+    
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.fsync_interval if self._dirty else None)
+            except queue.Empty:
+                # Idle with unsynced data - sync it now rather than on the next write
+                self._sync_dirty()
+                continue
+            if item is None:
+                self._sync_dirty()
+                return
+            
+            # Group commit: everything already queued, up to max_batch
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            
+            self._write(batch)
+            if stop:
+                self._sync_dirty()
+                return
+    
+    def _write(self, batch):
+        """Write one batch, grouped by sink in submission order"""
+        grouped = {}
+        for sink, line, record, _ in batch:
+            grouped.setdefault(sink, []).append((line, record))
+        
+        now = time.monotonic()
+        for sink, items in grouped.items():
+            fsync = self.fsync == 'always' or (
+                self.fsync == 'interval' and now - self._last_fsync.get(sink, 0) >= self.fsync_interval
+            )
+            try:
+                sink.write_batch(items, fsync=fsync)
+            except Exception as e:
+                print(f"Failed to write {len(items)} log records: {str(e)}")
+                continue
+            if fsync:
+                self._last_fsync[sink] = now
+                self._dirty.discard(sink)
+            elif self.fsync == 'interval':
+                self._dirty.add(sink)
+    
+        # Failed writes count as done too - they are reported, not retried
+        with self._progress:
+            self._written = max(self._written, batch[-1][3])
+            self._progress.notify_all()
+    
+    def _sync_dirty(self):
+        """fsync sinks written since their last sync"""
+        for sink in list(self._dirty):
+            try:
+                sink.write_batch([], fsync=True)
+            except Exception as e:
+                print(f"Failed to sync log: {str(e)}")
+            self._last_fsync[sink] = time.monotonic()
+        self._dirty.clear()
+    
+    def flush(self):
+        """Block until every record queued before the call is written
+        
+        Records queued by other threads meanwhile are not waited for, so
+        steady appends cannot hold a reader up.
+        """
+        target = self._enqueued
+        with self._progress:
+            while self._written < target:
+                if self._thread is None or not self._thread.is_alive():
+                    return
+                self._progress.wait(timeout=self.fsync_interval)
+    
+    def close(self):
+        """Drain the queue and stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                self._closed = True
+                return
+            self._queue.put(None)
+        thread.join()
+        self._closed = True
+        
+        # Anything queued while the writer was stopping
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftover.append(item)
+        if leftover:
+            self._write(leftover)
+
+# Global instance
+log_writer = LogWriter()
+atexit.register(log_writer.close)
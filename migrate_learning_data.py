@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Learning Data Migration
+Imports the JSONL case, feedback and breed feedback logs (all segments) into the SQLite store
+"""
+
+import argparse
+import os
+
+from jsonl_log import iter_log_records
+from learning_storage import SqliteStorage
+
+CHUNK_SIZE = 1000
+
+SOURCES = [
+    ('cases', 'learning_data/cases.jsonl'),
+    ('feedback', 'learning_data/feedback.jsonl'),
+    ('breed_feedback', 'learning_data/breed_feedback.jsonl')
+]
+
+def read_chunks(path, chunk_size=CHUNK_SIZE):
+    """Yield lists of parsed records from every segment of a log, oldest first (read-only)"""
+    chunk = []
+    for record in iter_log_records(path):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def migrate(db_path, sources=SOURCES, force=False):
+    """Copy every JSONL record into the database, one transaction per chunk"""
+    storage = SqliteStorage(db_path)
+    existing = storage.counts()
+    if not force and (existing['cases'] or existing['feedback']):
+        print(f"{db_path} already holds {existing['cases']} cases and {existing['feedback']} feedback records")
+        print("Use --force to import anyway (records will be duplicated)")
+        return False
+    
+    for table, path in sources:
+        if not os.path.exists(path):
+            print(f"No {path} - skipping {table}")
+            continue
+        
+        imported = 0
+        for chunk in read_chunks(path):
+            storage.insert(table, chunk)
+            imported += len(chunk)
+        print(f"Imported {imported} {table} records from {path}")
+    
+    storage.close()
+    print(f"Done - set LEARNING_STORAGE=sqlite (LEARNING_DB={db_path}) to use the database")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Import JSONL learning logs into SQLite')
+    parser.add_argument('--db', default=os.environ.get('LEARNING_DB', 'learning_data/learning.db'))
+    parser.add_argument('--force', action='store_true', help='Import even if the database is not empty')
+    args = parser.parse_args()
+    
+    migrate(args.db, force=args.force)
@@ -2,12 +2,15 @@
 ML Model Handler for Cattle Breed Classification
 """
 
-import tensorflow as tf
 import numpy as np
 import json
 import os
+import threading
 from datetime import datetime
 
+# TensorFlow takes seconds to import - loaded on first use by _import_tensorflow()
+tf = None
+
 # Indian cattle and buffalo breeds (74 total)
 INDIAN_BREEDS = {
     'Gir': 0, 'Sahiwal': 1, 'Red_Sindhi': 2, 'Tharparkar': 3, 'Rathi': 4,
@@ -28,15 +31,174 @@ INDIAN_BREEDS = {
     'Rojhan': 71, 'Dajal': 72, 'Forest_Buffalo': 73
 }
 
+# Batch sizes the compiled inference function is traced for; smaller batches
+# are zero-padded up to the next bucket, larger ones are split
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+def _import_tensorflow():
+    """Import TensorFlow on first use"""
+    global tf
+    if tf is None:
+        import tensorflow
+        tf = tensorflow
+    return tf
+
+class KerasBackend:
+    """Float32 Keras model served through compiled, bucketed inference graphs"""
+    
+    name = 'keras'
+    
+    def __init__(self, model_path, input_size=(224, 224), num_threads=None):
+        # num_threads is for the TFLite interpreter; Keras runs on TensorFlow's own thread pools
+        _import_tensorflow()
+        self.model = tf.keras.models.load_model(model_path)
+        self.input_size = input_size
+        self._inference_fns = None
+    
+    def predict(self, batch):
+        """Class probabilities for an (N, H, W, 3) float batch"""
+        if self._inference_fns is None:
+            self.compile()
+        
+        if not self._inference_fns:
+            return self.model.predict(batch, verbose=0)
+        
+        batch = np.asarray(batch, dtype=np.float32)
+        max_bucket = BATCH_BUCKETS[-1]
+        outputs = []
+        
+        for start in range(0, len(batch), max_bucket):
+            chunk = batch[start:start + max_bucket]
+            size = len(chunk)
+            bucket = next(b for b in BATCH_BUCKETS if b >= size)
+            
+            if size < bucket:
+                padding = np.zeros((bucket - size,) + chunk.shape[1:], dtype=np.float32)
+                chunk = np.concatenate([chunk, padding])
+            
+            outputs.append(self._inference_fns[bucket](tf.constant(chunk)).numpy()[:size])
+        
+        return np.concatenate(outputs)
+    
+    def compile(self):
+        """Trace one fixed-shape inference graph per batch bucket
+        
+        Calling the traced graph directly skips the data-adapter and iterator
+        setup that model.predict() repeats on every call.
+        """
+        model = self.model
+        
+        @tf.function
+        def infer(batch):
+            return model(batch, training=False)
+        
+        height, width = self.input_size
+        try:
+            self._inference_fns = {
+                bucket: infer.get_concrete_function(tf.TensorSpec((bucket, height, width, 3), tf.float32))
+                for bucket in BATCH_BUCKETS
+            }
+        except Exception as e:
+            # Empty dict - fall back to model.predict from now on
+            print(f"Compiled inference unavailable, using model.predict: {str(e)}")
+            self._inference_fns = {}
+    
+    def warmup(self):
+        """Trace and run every bucket once"""
+        self.compile()
+        height, width = self.input_size
+        for bucket in BATCH_BUCKETS:
+            self.predict(np.zeros((bucket, height, width, 3), dtype=np.float32))
+        return list(BATCH_BUCKETS)
+
+class TFLiteBackend:
+    """TFLite model (float, dynamic-range or full-int8) run by the TFLite interpreter"""
+    
+    name = 'tflite'
+    
+    def __init__(self, model_path, input_size=(224, 224), num_threads=None):
+        _import_tensorflow()
+        self.model = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self.model.allocate_tensors()
+        self.input_size = input_size
+        self.num_threads = num_threads
+        self._input = self.model.get_input_details()[0]
+        self._output = self.model.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        # The interpreter holds per-call tensor state and is not thread-safe
+        self._lock = threading.Lock()
+    
+    def predict(self, batch):
+        """Class probabilities for an (N, H, W, 3) float batch"""
+        batch = np.asarray(batch, dtype=np.float32)
+        
+        with self._lock:
+            if len(batch) != self._batch_size:
+                self.model.resize_tensor_input(self._input['index'], batch.shape)
+                self.model.allocate_tensors()
+                self._input = self.model.get_input_details()[0]
+                self._output = self.model.get_output_details()[0]
+                self._batch_size = len(batch)
+            
+            self.model.set_tensor(self._input['index'], self._quantize(batch))
+            self.model.invoke()
+            output = self.model.get_tensor(self._output['index'])
+        
+        return self._dequantize(output)
+    
+    def _quantize(self, batch):
+        """Map float input onto the model's integer input type (full-int8 models)"""
+        dtype = self._input['dtype']
+        if dtype == np.float32:
+            return batch
+        
+        scale, zero_point = self._input['quantization']
+        info = np.iinfo(dtype)
+        return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+    
+    def _dequantize(self, output):
+        """Map integer output back to float probabilities"""
+        if self._output['dtype'] == np.float32:
+            return output
+        
+        scale, zero_point = self._output['quantization']
+        return (output.astype(np.float32) - zero_point) * scale
+    
+    def warmup(self):
+        """Run one single-image batch so tensors are allocated before the first request"""
+        height, width = self.input_size
+        self.predict(np.zeros((1, height, width, 3), dtype=np.float32))
+        return [1]
+
+# Pluggable inference backends, selected by name or by model file extension
+BACKENDS = {
+    'keras': KerasBackend,
+    'tflite': TFLiteBackend
+}
+
+def create_backend(model_path, backend=None, input_size=(224, 224), num_threads=None):
+    """Instantiate the inference backend for a model file"""
+    if backend is None:
+        backend = 'tflite' if model_path.endswith('.tflite') else 'keras'
+    
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    
+    return BACKENDS[backend](model_path, input_size=input_size, num_threads=num_threads)
+
 class CattleBreedClassifier:
     """Main classifier for Indian cattle and buffalo breeds"""
     
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, backend=None, num_threads=None):
         self.model = None
+        self.backend = None
+        self.backend_name = backend
+        self.num_threads = num_threads
         self.breed_names = list(INDIAN_BREEDS.keys())
         self.num_classes = len(INDIAN_BREEDS)
         self.input_size = (224, 224)
         self.breed_mapping = None
+        self.model_version = 'dummy'
         
         if model_path and os.path.exists(model_path):
             self.load_model(model_path)
@@ -45,13 +207,25 @@ class CattleBreedClassifier:
     def load_model(self, model_path):
         """Load the trained model"""
         try:
-            self.model = tf.keras.models.load_model(model_path)
-            print(f"Model loaded successfully from {model_path}")
+            self.backend = create_backend(
+                model_path,
+                backend=self.backend_name,
+                input_size=self.input_size,
+                num_threads=self.num_threads
+            )
+            self.model = self.backend.model
+            self.model_version = f"{self.backend.name}:{self._model_version(model_path)}"
+            print(f"Model loaded successfully from {model_path} ({self.backend.name} backend)")
             return True
         except Exception as e:
             print(f"Failed to load model: {str(e)}")
             return False
     
+    def _model_version(self, model_path):
+        """Identify the loaded weights so caches can tell model versions apart"""
+        stat = os.stat(model_path)
+        return f"{os.path.basename(model_path)}:{int(stat.st_mtime)}:{stat.st_size}"
+    
     def load_breed_mapping(self):
         """Load breed mapping from file"""
         mapping_path = 'models/breed_mapping.json'
@@ -75,37 +249,90 @@ class CattleBreedClassifier:
                 image = np.expand_dims(image, axis=0)
             
             # Get predictions
-            predictions = self.model.predict(image, verbose=0)
+            predictions = self.predict_probabilities(image)
             
-            # Process results
-            num_predictions = min(5, len(self.breed_names))
-            top_indices = np.argsort(predictions[0])[::-1][:num_predictions]
-            results = []
-            
-            for i, idx in enumerate(top_indices):
-                confidence = float(predictions[0][idx])
-                breed_name = self.breed_names[idx] if idx < len(self.breed_names) else f"Unknown_{idx}"
-                
-                results.append({
-                    'breed': breed_name,
-                    'confidence': round(confidence * 100, 2),
-                    'rank': i + 1
-                })
+            return self.format_prediction(predictions[0])
             
+        except Exception as e:
             return {
-                'success': True,
-                'primary_breed': results[0]['breed'],
-                'confidence': results[0]['confidence'],
-                'alternatives': results[1:] if len(results) > 1 else [],
+                'success': False,
+                'error': str(e),
                 'timestamp': datetime.now().isoformat()
             }
+    
+    def predict_probabilities(self, batch):
+        """Run the model on an (N, 224, 224, 3) batch and return class probabilities"""
+        return self.backend.predict(batch)
+    
+    def warmup(self):
+        """Prepare the backend so the first request sees steady-state latency"""
+        if self.backend is None:
+            return False
+        
+        try:
+            batch_sizes = self.backend.warmup()
+            print(f"Inference warmed up for batch sizes {batch_sizes}")
+            return True
+        except Exception as e:
+            print(f"Warmup failed: {str(e)}")
+            return False
+    
+    def predict_batch(self, images):
+        """Predict breeds for an (N, 224, 224, 3) batch - one result per image"""
+        try:
+            if self.model is None:
+                return [self._dummy_prediction() for _ in range(len(images))]
             
+            predictions = self.predict_probabilities(images)
+            
+            return self.format_predictions(predictions)
+        
         except Exception as e:
-            return {
+            error = {
                 'success': False,
                 'error': str(e),
                 'timestamp': datetime.now().isoformat()
             }
+            return [dict(error) for _ in range(len(images))]
+    
+    def format_prediction(self, probabilities):
+        """Build the prediction response for a single row of class probabilities"""
+        return self.format_predictions(np.expand_dims(probabilities, axis=0))[0]
+        
+    def format_predictions(self, probabilities):
+        """Build prediction responses for an (N, num_classes) probability matrix"""
+        probabilities = np.asarray(probabilities)
+        num_predictions = min(5, len(self.breed_names), probabilities.shape[1])
+            
+        # Top-k for every row at once: partition, then sort only the k survivors
+        top_indices = np.argpartition(-probabilities, num_predictions - 1, axis=1)[:, :num_predictions]
+        top_probs = np.take_along_axis(probabilities, top_indices, axis=1)
+        order = np.argsort(-top_probs, axis=1, kind='stable')
+        top_indices = np.take_along_axis(top_indices, order, axis=1).tolist()
+        top_probs = np.take_along_axis(top_probs, order, axis=1).tolist()
+        
+        timestamp = datetime.now().isoformat()
+        responses = []
+        
+        for indices, confidences in zip(top_indices, top_probs):
+            results = [
+                {
+                    'breed': self.breed_names[idx] if idx < len(self.breed_names) else f"Unknown_{idx}",
+                    'confidence': round(confidence * 100, 2),
+                    'rank': rank + 1
+                }
+                for rank, (idx, confidence) in enumerate(zip(indices, confidences))
+            ]
+        
+            responses.append({
+                'success': True,
+                'primary_breed': results[0]['breed'],
+                'confidence': results[0]['confidence'],
+                'alternatives': results[1:],
+                'timestamp': timestamp
+            })
+        
+        return responses
     
     def _dummy_prediction(self):
         """Generate dummy prediction when model is not available"""
@@ -141,6 +368,7 @@ def load_breed_model(model_path='models/cattle_breed_model.h5'):
     """Load and return trained model"""
     if os.path.exists(model_path):
         try:
+            _import_tensorflow()
             model = tf.keras.models.load_model(model_path)
             return model
         except Exception as e:
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Pattern Persistence Engine - write-ahead log plus periodic snapshots
+Every update is appended to a compact delta log; the full state is
+snapshotted in the background and the log tail replayed on startup
+"""
+
+import glob
+import json
+import os
+import threading
+
+# Snapshot when this many deltas are pending, or every SNAPSHOT_INTERVAL seconds
+SNAPSHOT_EVERY = 500
+SNAPSHOT_INTERVAL = 30
+
+# Snapshot key recording which log generation the snapshot is current up to
+GENERATION_KEY = "_wal_generation"
+
+class PatternStore:
+    """Crash-consistent store for the learned pattern state"""
+    
+    def __init__(self, snapshot_path, default_state, apply_delta,
+                 snapshot_every=SNAPSHOT_EVERY, snapshot_interval=SNAPSHOT_INTERVAL, fsync=False,
+                 from_json=None, to_json=None):
+        self.snapshot_path = snapshot_path
+        self.default_state = default_state
+        self.apply_delta = apply_delta
+        # For states that are not a plain dict: convert to and from the JSON snapshot
+        self.from_json = from_json or (lambda data: data)
+        self.to_json = to_json or (lambda state: state)
+        self.snapshot_every = snapshot_every
+        self.snapshot_interval = snapshot_interval
+        self.fsync = fsync
+        
+        self.state = None
+        self.generation = 0
+        self.pending = 0
+        self._log = None
+        self._lock = threading.RLock()
+        self._snapshot_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        
+        self.load()
+    
+    def _log_path(self, generation):
+        # Logs are numbered generations; a snapshot is stamped with the first one it does not cover
+        return f"{self.snapshot_path}.wal.{generation}"
+    
+    def _log_generations(self):
+        """Generations of the delta logs currently on disk, oldest first"""
+        generations = []
+        for path in glob.glob(glob.escape(self.snapshot_path) + ".wal.*"):
+            suffix = path.rsplit(".", 1)[1]
+            if suffix.isdigit():
+                generations.append(int(suffix))
+        return sorted(generations)
+    
+    def load(self):
+        """Load the last snapshot and replay the log tail"""
+        with self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
+            
+            state = self.default_state()
+            snapshot_generation = 0
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, 'r') as f:
+                    data = json.load(f)
+                snapshot_generation = data.pop(GENERATION_KEY, 0)
+                state = self.from_json(data)
+            
+            # Replaying every log at or after the snapshot's stamp means a crash
+            # anywhere in snapshot() neither loses nor double-applies an update
+            replayed = 0
+            generations = self._log_generations()
+            for generation in generations:
+                if generation < snapshot_generation:
+                    # Already folded into the snapshot - left over from a crash
+                    os.remove(self._log_path(generation))
+                    continue
+                replayed += self._replay(self._log_path(generation), state)
+            
+            self.state = state
+            self.generation = max([snapshot_generation] + generations)
+            self.pending = replayed
+            self._open_log()
+            return state
+    
+    def _replay(self, path, state):
+        """Apply every complete delta in a log file"""
+        applied = 0
+        with open(path, 'rb') as f:
+            data = f.read()
+        
+        valid_length = 0
+        for line in data.split(b"\n"):
+            if not line.strip():
+                valid_length += len(line) + 1
+                continue
+            try:
+                delta = json.loads(line)
+            except ValueError:
+                # Torn write from a crash - everything after it is unreliable
+                break
+            self.apply_delta(state, delta)
+            applied += 1
+            valid_length += len(line) + 1
+        
+        # Drop a torn tail so new appends start on a clean line
+        if valid_length < len(data):
+            with open(path, 'r+b') as f:
+                f.truncate(valid_length)
+        elif data and not data.endswith(b"\n"):
+            with open(path, 'ab') as f:
+                f.write(b"\n")
+        return applied
+    
+    def _open_log(self):
+        self._log = open(self._log_path(self.generation), 'a')
+    
+    def update(self, delta):
+        """Durably log one delta, then apply it to the in-memory state - O(1)"""
+        with self._lock:
+            self._log.write(json.dumps(delta, separators=(',', ':')) + "\n")
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+            
+            self.apply_delta(self.state, delta)
+            self.pending += 1
+        
+        if self.pending >= self.snapshot_every:
+            self._wake.set()
+    
+    def snapshot(self):
+        """Write the full state to the snapshot file and drop replayed logs"""
+        with self._snapshot_lock:
+            with self._lock:
+                if self.pending == 0 and os.path.exists(self.snapshot_path):
+                    return False
+                
+                # Start a new log generation before copying, so the copy covers
+                # exactly the logs below the new generation
+                self._log.close()
+                self.generation += 1
+                self._open_log()
+                generation = self.generation
+                data = json.dumps({**self.to_json(self.state), GENERATION_KEY: generation}, indent=2)
+                self.pending = 0
+            
+            temp_path = self.snapshot_path + ".tmp"
+            with open(temp_path, 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.snapshot_path)
+            
+            # Only once the new snapshot is in place are the logs it covers deleted
+            for old in self._log_generations():
+                if old < generation:
+                    os.remove(self._log_path(old))
+            return True
+    
+    def start(self):
+        """Start the background snapshot thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='pattern-snapshots', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.snapshot_interval)
+            self._wake.clear()
+            if self.pending:
+                try:
+                    self.snapshot()
+                except Exception as e:
+                    print(f"Pattern snapshot failed: {str(e)}")
+    
+    def close(self):
+        """Final snapshot and stop the background thread"""
+        self._stopped.set()
+        self._wake.set()
+        try:
+            self.snapshot()
+        except Exception as e:
+            print(f"Pattern snapshot failed: {str(e)}")
+        with self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
+    
+    def reset(self):
+        """Forget all state and logs (after the data directory is cleared)"""
+        with self._snapshot_lock, self._lock:
+            if self._log:
+                self._log.close()
+            for generation in self._log_generations():
+                os.remove(self._log_path(generation))
+            if os.path.exists(self.snapshot_path):
+                os.remove(self.snapshot_path)
+            os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+            
+            self.state = self.default_state()
+            self.generation = 0
+            self.pending = 0
+            self._open_log()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Bitmask-Indexed Symptom Pattern Table
+Active-symptom combinations are encoded as integer bitmasks and disease
+counts live in a dense NumPy table indexed by (pattern, disease id)
+"""
+
+import numpy as np
+
+# The six orchestrator symptoms - bit i of a pattern mask is SYMPTOM_FIELDS[i]
+SYMPTOM_FIELDS = ("fever", "appetite", "cough", "nasal_discharge", "weakness", "digestive_issue")
+ACTIVE_VALUES = ("yes", "stopped", "low")
+NUM_PATTERNS = 1 << len(SYMPTOM_FIELDS)
+
+SYMPTOM_BITS = {name: 1 << i for i, name in enumerate(SYMPTOM_FIELDS)}
+
+# Legacy "+"-joined pattern keys (sorted symptom names) for every mask
+PATTERN_KEYS = [
+    "+".join(sorted(name for name in SYMPTOM_FIELDS if mask & SYMPTOM_BITS[name]))
+    for mask in range(NUM_PATTERNS)
+]
+PATTERN_MASKS = {key: mask for mask, key in enumerate(PATTERN_KEYS)}
+ACTIVE_COUNTS = [bin(mask).count("1") for mask in range(NUM_PATTERNS)]
+
+def encode_symptoms(symptoms):
+    """Bitmask of the active symptoms in a symptom dict"""
+    mask = 0
+    for name, bit in SYMPTOM_BITS.items():
+        if symptoms.get(name) in ACTIVE_VALUES:
+            mask |= bit
+    return mask
+
+def pattern_key_to_mask(pattern_key):
+    """Bitmask for a legacy pattern key; None if it names an unknown symptom"""
+    mask = PATTERN_MASKS.get(pattern_key)
+    if mask is None and pattern_key:
+        mask = 0
+        for name in pattern_key.split("+"):
+            if name not in SYMPTOM_BITS:
+                return None
+            mask |= SYMPTOM_BITS[name]
+    return mask
+
+class PatternTable:
+    """Learned symptom -> disease statistics with O(1) pattern lookups"""
+    
+    def __init__(self, initial_diseases=8):
+        self.disease_ids = {}
+        self.disease_names = []
+        self.counts = np.zeros((NUM_PATTERNS, initial_diseases), dtype=np.int64)
+        
+        # First-seen order, so the JSON export keeps the legacy ordering
+        self.map_order = []
+        self.map_diseases = [[] for _ in range(NUM_PATTERNS)]
+        
+        # Running total and leading disease per pattern, updated with the counts,
+        # and the (disease, count, total) lookup result built once per change
+        self.totals = [0] * NUM_PATTERNS
+        self.leaders = [None] * NUM_PATTERNS
+        self.leader_counts = [0] * NUM_PATTERNS
+        self._lookups = [None] * NUM_PATTERNS
+        
+        # Common patterns (2+ active symptoms)
+        self.common_counts = np.zeros(NUM_PATTERNS, dtype=np.int64)
+        self.common_diseases = [[] for _ in range(NUM_PATTERNS)]
+        self.common_order = []
+        
+        # Feedback per symptom pattern (rating >= 4 counts as correct)
+        self.pattern_correct = np.zeros(NUM_PATTERNS, dtype=np.int64)
+        self.pattern_total = np.zeros(NUM_PATTERNS, dtype=np.int64)
+        
+        self.accuracy_scores = {}
+        self.question_effectiveness = {}
+    
+    def disease_id(self, disease):
+        """Intern a disease name, growing the table when a new one appears"""
+        disease_id = self.disease_ids.get(disease)
+        if disease_id is None:
+            disease_id = len(self.disease_names)
+            self.disease_ids[disease] = disease_id
+            self.disease_names.append(disease)
+            if disease_id >= self.counts.shape[1]:
+                grown = np.zeros((NUM_PATTERNS, self.counts.shape[1] * 2), dtype=np.int64)
+                grown[:, :self.counts.shape[1]] = self.counts
+                self.counts = grown
+        return disease_id
+    
+    def _count_disease(self, mask, disease):
+        disease_id = self.disease_id(disease)
+        count = int(self.counts[mask, disease_id]) + 1
+        if count == 1:
+            if not self.map_diseases[mask]:
+                self.map_order.append(mask)
+            self.map_diseases[mask].append(disease_id)
+        self.counts[mask, disease_id] = count
+        self.totals[mask] += 1
+        
+        # Only the counted disease can overtake the leader; ties go to the
+        # disease first seen with this pattern
+        leader = self.leaders[mask]
+        if leader is None or count > self.leader_counts[mask] or (
+            count == self.leader_counts[mask]
+            and self.map_diseases[mask].index(disease_id) < self.map_diseases[mask].index(leader)
+        ):
+            self.leaders[mask] = disease_id
+            self.leader_counts[mask] = count
+        self._lookups[mask] = None
+    
+    def _recount(self, mask):
+        """Recompute a pattern's total and leader from its counts"""
+        row = self.counts[mask]
+        self.totals[mask] = int(row.sum())
+        self.leaders[mask] = None
+        self.leader_counts[mask] = 0
+        for disease_id in self.map_diseases[mask]:
+            if row[disease_id] > self.leader_counts[mask]:
+                self.leaders[mask] = disease_id
+                self.leader_counts[mask] = int(row[disease_id])
+        self._lookups[mask] = None
+    
+    def add_case(self, mask, disease):
+        """Count one case of a disease for a symptom pattern"""
+        if mask and disease:
+            self._count_disease(mask, disease)
+        
+        if ACTIVE_COUNTS[mask] >= 2:
+            if self.common_counts[mask] == 0:
+                self.common_order.append(mask)
+            self.common_counts[mask] += 1
+            # Diseases seen with a common pattern may include None (no prediction)
+            disease_id = self.disease_id(disease) if disease else None
+            if disease_id not in self.common_diseases[mask]:
+                self.common_diseases[mask].append(disease_id)
+    
+    def add_feedback(self, diagnosis, rating, mask=None, predicted=None):
+        """Update accuracy scores from feedback on a case
+        
+        With the case's symptom pattern known, the rating also counts toward
+        that pattern's accuracy, and a vet diagnosis naming a known disease is
+        learned for the pattern.
+        """
+        # decision_table imports this module
+        from decision_table import known_disease
+        
+        correct = bool(rating and rating >= 4)
+        if diagnosis:
+            scores = self.accuracy_scores.setdefault(diagnosis, {"correct": 0, "total": 0})
+            scores["total"] += 1
+            if correct:
+                scores["correct"] += 1
+        
+        if mask:
+            self.pattern_total[mask] += 1
+            if correct:
+                self.pattern_correct[mask] += 1
+            # Free text that names no known disease is never served as one; a
+            # diagnosis that confirms the prediction was already counted with the case
+            disease = known_disease(diagnosis)
+            if disease and (disease != predicted or not correct):
+                self._count_disease(mask, disease)
+    
+    def learned_pattern_count(self):
+        """Number of symptom patterns with at least one learned disease"""
+        return len(self.map_order)
+    
+    def lookup(self, mask):
+        """(disease, count, total) for the most common disease of a pattern, or None
+        
+        O(1): the leader is maintained on every update, and the result tuple
+        is shared until the pattern changes.
+        """
+        result = self._lookups[mask]
+        if result is None:
+            leader = self.leaders[mask]
+            if leader is None:
+                return None
+            result = self._lookups[mask] = (self.disease_names[leader], self.leader_counts[mask], self.totals[mask])
+        return result
+    
+    def to_json(self):
+        """Export in the legacy patterns.json shape"""
+        return {
+            "symptom_disease_map": {
+                PATTERN_KEYS[mask]: {
+                    self.disease_names[d]: int(self.counts[mask, d]) for d in self.map_diseases[mask]
+                }
+                for mask in self.map_order
+            },
+            "accuracy_scores": {name: dict(scores) for name, scores in self.accuracy_scores.items()},
+            "common_patterns": [
+                {
+                    "pattern": PATTERN_KEYS[mask],
+                    "count": int(self.common_counts[mask]),
+                    "diseases": [self.disease_names[d] if d is not None else None for d in self.common_diseases[mask]]
+                }
+                for mask in self.common_order
+            ],
+            "question_effectiveness": dict(self.question_effectiveness),
+            "pattern_accuracy": {
+                PATTERN_KEYS[mask]: {"correct": int(self.pattern_correct[mask]), "total": int(self.pattern_total[mask])}
+                for mask in np.flatnonzero(self.pattern_total)
+            }
+        }
+    
+    @classmethod
+    def from_json(cls, patterns):
+        """Build a table from the legacy patterns.json shape"""
+        table = cls()
+        
+        for pattern_key, diseases in patterns.get("symptom_disease_map", {}).items():
+            mask = pattern_key_to_mask(pattern_key)
+            if not mask:
+                print(f"Skipping pattern with unknown symptoms: {pattern_key}")
+                continue
+            table.map_order.append(mask)
+            for disease, count in diseases.items():
+                disease_id = table.disease_id(disease)
+                table.map_diseases[mask].append(disease_id)
+                table.counts[mask, disease_id] = count
+            table._recount(mask)
+        
+        for entry in patterns.get("common_patterns", []):
+            mask = pattern_key_to_mask(entry["pattern"])
+            if not mask:
+                continue
+            table.common_order.append(mask)
+            table.common_counts[mask] = entry["count"]
+            table.common_diseases[mask] = [
+                table.disease_id(d) if d else None for d in entry.get("diseases", [])
+            ]
+        
+        for pattern_key, scores in patterns.get("pattern_accuracy", {}).items():
+            mask = pattern_key_to_mask(pattern_key)
+            if mask:
+                table.pattern_correct[mask] = scores["correct"]
+                table.pattern_total[mask] = scores["total"]
+        
+        table.accuracy_scores = {name: dict(scores) for name, scores in patterns.get("accuracy_scores", {}).items()}
+        table.question_effectiveness = dict(patterns.get("question_effectiveness", {}))
+        return table
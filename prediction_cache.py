@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Prediction Cache
+LRU + TTL cache of breed predictions keyed by upload digest and model version
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Default cache settings
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_DISTANCE = 4  # Hamming distance between 64-bit dHashes
+
+def perceptual_hash(image):
+    """64-bit difference hash of an RGB image (uint8 or normalized float)"""
+    gray = cv2.cvtColor(np.asarray(image, dtype=np.float32), cv2.COLOR_RGB2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+class PredictionCache:
+    """Bounded LRU cache of prediction results with per-entry expiry
+    
+    Keys are sha256(model_version + upload bytes), so a new model version makes
+    every older entry unreachable. In perceptual mode, re-encoded or resized
+    copies of a cached image are matched by dHash within max_distance bits.
+    """
+    
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 perceptual=False, max_distance=DEFAULT_MAX_DISTANCE):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        self._entries = OrderedDict()  # key -> (expires_at, model_version, phash, result)
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'perceptual_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+    
+    def make_key(self, image_bytes, model_version):
+        """Content address for an upload under a given model version"""
+        digest = hashlib.sha256(str(model_version).encode())
+        digest.update(b'\0')
+        digest.update(image_bytes)
+        return digest.hexdigest()
+    
+    def get(self, key):
+        """Look up an exact upload digest"""
+        with self._lock:
+            result = self._get_locked(key)
+            if result is not None:
+                self._stats['hits'] += 1
+            elif not self.perceptual:
+                # In perceptual mode get_similar() has the final say
+                self._stats['misses'] += 1
+            return result
+    
+    def get_similar(self, image, model_version):
+        """Look up a near-duplicate of a decoded image (perceptual mode only)"""
+        if not self.perceptual:
+            return None
+        
+        phash = perceptual_hash(image)
+        now = time.monotonic()
+        
+        with self._lock:
+            for key, (expires_at, version, entry_hash, result) in reversed(self._entries.items()):
+                if version != model_version or entry_hash is None or expires_at <= now:
+                    continue
+                if bin(phash ^ entry_hash).count('1') <= self.max_distance:
+                    self._entries.move_to_end(key)
+                    self._stats['perceptual_hits'] += 1
+                    return self._mark_cached(result)
+            
+            self._stats['misses'] += 1
+        return None
+    
+    def put(self, key, result, model_version, image=None):
+        """Store a prediction, evicting the least recently used entry when full"""
+        phash = perceptual_hash(image) if self.perceptual and image is not None else None
+        expires_at = time.monotonic() + self.ttl_seconds
+        
+        with self._lock:
+            self._entries[key] = (expires_at, model_version, phash, result)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+    
+    def clear(self):
+        """Drop every cached prediction"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['perceptual_hits'] + self._stats['misses']
+            hits = self._stats['hits'] + self._stats['perceptual_hits']
+            return {
+                **self._stats,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'perceptual': self.perceptual,
+                'hit_rate': round(hits / lookups * 100, 2) if lookups else 0
+            }
+    
+    def _get_locked(self, key):
+        """Return a live entry's result and refresh its LRU position"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            self._stats['expirations'] += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        return self._mark_cached(entry[3])
+    
+    def _mark_cached(self, result):
+        """Copy of a cached result flagged as served from cache"""
+        return {**result, 'cached': True}
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Symptom Matcher - compiled multilingual symptom extraction
+One combined regex over the lexicon finds symptom terms, negation cues and
+clause breaks in a single pass; negation scope is resolved on the matches
+"""
+
+import argparse
+import json
+import re
+
+from pattern_table import SYMPTOM_FIELDS
+
+# (phrase, field, value, value when negated - None keeps the value)
+# Phrases match at the start of a word, so "cough" also finds "coughing"
+LEXICON = {
+    "en": [
+        ("fever", "fever", "yes", "no"),
+        ("feverish", "fever", "yes", "no"),
+        ("hot", "fever", "yes", "no"),
+        ("temperature", "fever", "yes", "no"),
+        ("not eating well", "appetite", "low", None),
+        ("not eating properly", "appetite", "low", None),
+        ("not eating normal", "appetite", "low", None),
+        ("not eating", "appetite", "stopped", None),
+        ("stopped eating", "appetite", "stopped", None),
+        ("refusing feed", "appetite", "stopped", None),
+        ("no appetite", "appetite", "stopped", None),
+        ("eating less", "appetite", "low", None),
+        ("low appetite", "appetite", "low", None),
+        ("eating normal", "appetite", "normal", "low"),
+        ("eating well", "appetite", "normal", "low"),
+        ("cough", "cough", "yes", "no"),
+        ("nasal discharge", "nasal_discharge", "yes", "no"),
+        ("nasal", "nasal_discharge", "yes", "no"),
+        ("discharge", "nasal_discharge", "yes", "no"),
+        ("runny nose", "nasal_discharge", "yes", "no"),
+        ("mucus", "nasal_discharge", "yes", "no"),
+        ("weak", "weakness", "yes", "no"),
+        ("lying down", "weakness", "yes", "no"),
+        ("can't stand", "weakness", "yes", None),
+        ("cant stand", "weakness", "yes", None),
+        ("cannot stand", "weakness", "yes", None),
+        ("diarrhea", "digestive_issue", "yes", "no"),
+        ("diarrhoea", "digestive_issue", "yes", "no"),
+        ("loose stool", "digestive_issue", "yes", "no"),
+        ("bloat", "digestive_issue", "yes", "no"),
+        ("constipation", "digestive_issue", "yes", "no")
+    ],
+    "hi": [
+        ("बुखार", "fever", "yes", "no"),
+        ("बुख़ार", "fever", "yes", "no"),
+        ("गर्मी", "fever", "yes", "no"),
+        ("bukhar", "fever", "yes", "no"),
+        ("खाना नहीं", "appetite", "stopped", None),
+        ("चारा नहीं", "appetite", "stopped", None),
+        ("कम खा", "appetite", "low", None),
+        ("खांसी", "cough", "yes", "no"),
+        ("खाँसी", "cough", "yes", "no"),
+        ("khansi", "cough", "yes", "no"),
+        ("नाक", "nasal_discharge", "yes", "no"),
+        ("कमजोर", "weakness", "yes", "no"),
+        ("कमज़ोर", "weakness", "yes", "no"),
+        ("kamzor", "weakness", "yes", "no"),
+        ("दस्त", "digestive_issue", "yes", "no"),
+        ("पेट फूल", "digestive_issue", "yes", "no")
+    ],
+    "mr": [
+        ("ताप", "fever", "yes", "no"),
+        ("खोकला", "cough", "yes", "no"),
+        ("अशक्त", "weakness", "yes", "no"),
+        ("जुलाब", "digestive_issue", "yes", "no")
+    ],
+    "gu": [
+        ("તાવ", "fever", "yes", "no"),
+        ("ઉધરસ", "cough", "yes", "no"),
+        ("ઝાડા", "digestive_issue", "yes", "no")
+    ],
+    "pa": [
+        ("ਬੁਖਾਰ", "fever", "yes", "no"),
+        ("ਖੰਘ", "cough", "yes", "no"),
+        ("ਦਸਤ", "digestive_issue", "yes", "no")
+    ],
+    "bn": [
+        ("জ্বর", "fever", "yes", "no"),
+        ("কাশি", "cough", "yes", "no"),
+        ("ডায়রিয়া", "digestive_issue", "yes", "no")
+    ],
+    "ta": [
+        ("காய்ச்சல்", "fever", "yes", "no"),
+        ("இருமல்", "cough", "yes", "no")
+    ],
+    "te": [
+        ("జ్వరం", "fever", "yes", "no"),
+        ("దగ్గు", "cough", "yes", "no")
+    ]
+}
+
+# Cues before a term ("no fever") and after it ("बुखार नहीं है")
+NEGATION_PREFIXES = ["no", "not", "without", "never", "none", "doesn't have", "does not have", "बिना", "bina"]
+NEGATION_SUFFIXES = ["नहीं", "नही", "नाही", "nahi", "nahin"]
+
+# Clause breaks end a negation scope
+CLAUSE_BREAKS = [".", ",", ";", ":", "!", "?", "\n", "।", "but", "however", "although", "though", "लेकिन", "मगर", "पण"]
+
+# Negation reaches at most this many words from its cue
+NEGATION_WINDOW = 4
+
+# When several values of a field are found, the first listed wins
+VALUE_PRIORITY = {
+    field: ("stopped", "low", "normal") if field == "appetite" else ("yes", "no")
+    for field in SYMPTOM_FIELDS
+}
+
+# Separates texts in a batch - one regex pass over all of them
+DOCUMENT_SEPARATOR = "\x00"
+
+def _trie(phrases):
+    """Regex for a set of phrases with shared prefixes factored out
+    
+    Each step tries one branch per next character instead of every phrase,
+    and the longest phrase wins ("nasal discharge" over "nasal").
+    """
+    root = {}
+    for phrase in phrases:
+        node = root
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+    
+    return emit(root)
+
+def _alternation(phrases, whole_words=False):
+    """Regex matching any of the phrases
+    
+    Phrases starting with a letter only match at the start of a word ("नाक"
+    is not found inside "खतरनाक"); with whole_words they must also end one.
+    """
+    words = [phrase for phrase in set(phrases) if phrase[:1].isalpha()]
+    symbols = [phrase for phrase in set(phrases) if not phrase[:1].isalpha()]
+    parts = []
+    if words:
+        parts.append(r"(?<!\w)" + _trie(words) + (r"(?!\w)" if whole_words else ""))
+    if symbols:
+        parts.append(_trie(symbols))
+    return "|".join(parts)
+
+class SymptomMatcher:
+    """Compiled symptom extractor for a lexicon"""
+    
+    def __init__(self, lexicon=LEXICON, negation_prefixes=NEGATION_PREFIXES,
+                 negation_suffixes=NEGATION_SUFFIXES, clause_breaks=CLAUSE_BREAKS, window=NEGATION_WINDOW):
+        self.window = window
+        self.terms = {}
+        for entries in lexicon.values():
+            for phrase, field, value, negated in entries:
+                self.terms[phrase.lower()] = (field, value, negated)
+        
+        # Terms come first, so a term containing a cue ("no appetite") wins;
+        # cues are whole words ("no" does not start "normal"). The leading
+        # class lets the scan skip characters no phrase starts with.
+        phrases = list(self.terms) + list(negation_prefixes) + list(negation_suffixes) + list(clause_breaks)
+        first_chars = "".join(sorted({re.escape(phrase[0]) for phrase in phrases} | {DOCUMENT_SEPARATOR}))
+        self.pattern = re.compile(
+            f"(?=[{first_chars}])"
+            f"(?:(?P<term>{_alternation(self.terms)})"
+            f"|(?P<pre>{_alternation(negation_prefixes, whole_words=True)})"
+            f"|(?P<post>{_alternation(negation_suffixes, whole_words=True)})"
+            f"|(?P<brk>{_alternation(clause_breaks, whole_words=True)})"
+            f"|(?P<doc>{DOCUMENT_SEPARATOR}))"
+        )
+    
+    def _words_between(self, text, start, end):
+        return len(text[start:end].split())
+    
+    def _scan(self, text):
+        """Yield [field, value, negated value] hits, one list per document in text"""
+        hits = []
+        # Position of an open "no ..." scope, and terms a trailing "नहीं" may negate
+        negate_from = None
+        pending = []
+        
+        for match in self.pattern.finditer(text):
+            kind = match.lastgroup
+            
+            if kind == "term":
+                field, value, negated = self.terms[match.group()]
+                is_negated = negate_from is not None and \
+                    self._words_between(text, negate_from, match.start()) < self.window
+                hits.append([field, negated if is_negated and negated else value, negated])
+                pending.append((len(hits) - 1, match.end(), is_negated))
+            
+            elif kind == "pre":
+                negate_from = match.end()
+                pending = []
+            
+            elif kind == "post":
+                for hit_index, end, already_negated in pending:
+                    hit = hits[hit_index]
+                    if not already_negated and hit[2] and \
+                            self._words_between(text, end, match.start()) < self.window:
+                        hit[1] = hit[2]
+                pending = []
+            
+            elif kind == "brk":
+                negate_from = None
+                pending = []
+            
+            else:
+                yield hits
+                hits, negate_from, pending = [], None, []
+        
+        yield hits
+    
+    def _resolve(self, hits):
+        symptoms = {field: "unknown" for field in SYMPTOM_FIELDS}
+        for field, value, _ in hits:
+            current = symptoms[field]
+            if current == "unknown" or VALUE_PRIORITY[field].index(value) < VALUE_PRIORITY[field].index(current):
+                symptoms[field] = value
+        return symptoms
+    
+    def extract(self, text):
+        """Symptom dict (all six fields; unknown when not mentioned) for one text"""
+        text = (text or "").lower().replace(DOCUMENT_SEPARATOR, " ")
+        return self._resolve(next(self._scan(text)))
+    
+    def extract_batch(self, texts):
+        """Symptom dicts for many texts, in one regex pass over all of them"""
+        texts = [(text or "").lower().replace(DOCUMENT_SEPARATOR, " ") for text in texts]
+        if not texts:
+            return []
+        return [self._resolve(hits) for hits in self._scan(DOCUMENT_SEPARATOR.join(texts))]
+
+# Global instance
+matcher = SymptomMatcher()
+
+def extract_symptoms(text):
+    """Symptoms mentioned in a farmer's description"""
+    return matcher.extract(text)
+
+def extract_symptoms_batch(texts):
+    """Symptoms for a list of descriptions"""
+    return matcher.extract_batch(texts)
+
+def reprocess_cases(cases_path, output_path=None, chunk_size=1000):
+    """Re-extract text-derived symptoms for every logged case with a text_input
+    
+    Writes {"case_id", "text_input", "symptoms", "stored_symptoms"} lines to
+    output_path when given; returns (cases with text, cases whose stored
+    symptoms disagree with the re-extracted ones).
+    """
+    from jsonl_log import iter_log_records
+    
+    total = changed = 0
+    output = open(output_path, 'w') if output_path else None
+    
+    def process(chunk):
+        nonlocal total, changed
+        for case, symptoms in zip(chunk, extract_symptoms_batch([case["text_input"] for case in chunk])):
+            stored = case.get("symptoms") or {}
+            total += 1
+            # Stored symptoms also carry the checkbox answers - compare only what the text states
+            if any(value != "unknown" and stored.get(field, "unknown") != value for field, value in symptoms.items()):
+                changed += 1
+            if output:
+                output.write(json.dumps({
+                    "case_id": case.get("case_id"),
+                    "text_input": case["text_input"],
+                    "symptoms": symptoms,
+                    "stored_symptoms": stored
+                }) + "\n")
+    
+    try:
+        chunk = []
+        for case in iter_log_records(cases_path):
+            if isinstance(case, dict) and case.get("text_input"):
+                chunk.append(case)
+                if len(chunk) >= chunk_size:
+                    process(chunk)
+                    chunk = []
+        if chunk:
+            process(chunk)
+    finally:
+        if output:
+            output.close()
+    
+    return total, changed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Re-extract symptoms from logged case descriptions')
+    parser.add_argument('--cases', default='learning_data/cases.jsonl')
+    parser.add_argument('--output', help='JSONL file for the re-extracted symptoms')
+    parser.add_argument('text', nargs='*', help='Extract from these texts instead of the case log')
+    args = parser.parse_args()
+    
+    if args.text:
+        for text, symptoms in zip(args.text, extract_symptoms_batch(args.text)):
+            print(json.dumps({"text": text, "symptoms": symptoms}, ensure_ascii=False))
+    else:
+        total, changed = reprocess_cases(args.cases, args.output)
+        print(f"Re-extracted {total} case descriptions from {args.cases}; {changed} differ from the stored symptoms")
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+Test configuration - the modules live at the repository root
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Decision Table Equivalence
+The precomputed tables must answer exactly like the hand-written
+orchestrator and disease rules they replaced, for every symptom state
+"""
+
+import itertools
+import json
+
+import pytest
+
+from agent_orchestrator import decide_next_action
+from decision_table import decide, predict, FrozenRecord
+
+MISSING = object()
+
+# Every state the rules tell apart, plus unknown, invalid and missing values
+FIELD_VALUES = {
+    "fever": ("yes", "no", "unknown", "maybe", MISSING),
+    "appetite": ("normal", "low", "stopped", "unknown", "yes", MISSING),
+    "cough": ("yes", "no", "unknown", "maybe", MISSING),
+    "nasal_discharge": ("yes", "no", "unknown", "maybe", MISSING),
+    "weakness": ("yes", "no", "unknown", "maybe", MISSING),
+    "digestive_issue": ("yes", "no", "unknown", "maybe", MISSING)
+}
+
+VISION_RESULTS = (
+    {},
+    {"species": "cattle", "disease_signs": [], "visible_issues": []},
+    {"species": "cattle", "disease_signs": ["respiratory_distress"], "visible_issues": []}
+)
+
+def _all_symptoms():
+    for values in itertools.product(*FIELD_VALUES.values()):
+        yield {field: value for field, value in zip(FIELD_VALUES, values) if value is not MISSING}
+
+def _plain(record):
+    """JSON view of a record, so tuples and lists compare equal"""
+    return json.loads(json.dumps(record))
+
+# Frozen copy of agent_orchestrator.decide_next_action before the rules were precomputed
+def baseline_decide_next_action(vision_result, symptoms, case_meta, conversation_summary=""):
+    fever = symptoms.get("fever", "unknown")
+    appetite = symptoms.get("appetite", "unknown")
+    cough = symptoms.get("cough", "unknown")
+    nasal_discharge = symptoms.get("nasal_discharge", "unknown")
+    weakness = symptoms.get("weakness", "unknown")
+    digestive_issue = symptoms.get("digestive_issue", "unknown")
+    
+    known = []
+    missing = []
+    
+    if fever in ["yes", "no"]: known.append("fever")
+    else: missing.append("fever")
+    
+    if appetite in ["normal", "low", "stopped"]: known.append("appetite")
+    else: missing.append("appetite")
+    
+    if cough in ["yes", "no"]: known.append("cough")
+    else: missing.append("cough")
+    
+    if nasal_discharge in ["yes", "no"]: known.append("nasal_discharge")
+    else: missing.append("nasal_discharge")
+    
+    if weakness in ["yes", "no"]: known.append("weakness")
+    else: missing.append("weakness")
+    
+    if digestive_issue in ["yes", "no"]: known.append("digestive_issue")
+    else: missing.append("digestive_issue")
+    
+    if len(known) < 2:
+        q = []
+        if "fever" in missing[:3]: q.append("Does the animal have fever?")
+        if "appetite" in missing[:3] and len(q) < 3: q.append("Is it eating normally?")
+        if "cough" in missing[:3] and len(q) < 3: q.append("Is the animal coughing?")
+        
+        return {
+            "action": "ask_more",
+            "missing_fields": missing[:3],
+            "follow_up_questions": q,
+            "confidence_note": f"Only {len(known)} symptoms known. Need at least 2."
+        }
+    
+    if fever == "yes" and (cough == "yes" or nasal_discharge == "yes"):
+        return {
+            "action": "predict",
+            "missing_fields": [],
+            "follow_up_questions": [],
+            "confidence_note": "Fever + respiratory symptoms. Proceed to disease model."
+        }
+    
+    if fever == "yes" and digestive_issue == "yes":
+        return {
+            "action": "predict",
+            "missing_fields": [],
+            "follow_up_questions": [],
+            "confidence_note": "Fever + digestive issue. Proceed to disease model."
+        }
+    
+    if appetite in ["low", "stopped"] and (weakness == "yes" or digestive_issue == "yes"):
+        return {
+            "action": "predict",
+            "missing_fields": [],
+            "follow_up_questions": [],
+            "confidence_note": "Appetite + weakness/digestive pattern. Proceed to disease model."
+        }
+    
+    if len(known) >= 3:
+        return {
+            "action": "predict",
+            "missing_fields": [],
+            "follow_up_questions": [],
+            "confidence_note": f"{len(known)} symptoms present. Sufficient for prediction."
+        }
+    
+    if len(known) == 2:
+        q = []
+        if "fever" in missing: q.append("Does the animal have fever?")
+        elif "weakness" in missing: q.append("Is the animal weak or lying down?")
+        
+        if q:
+            return {
+                "action": "ask_more",
+                "missing_fields": [missing[0]] if missing else [],
+                "follow_up_questions": q,
+                "confidence_note": "2 symptoms present but pattern unclear. Need one more."
+            }
+    
+    return {
+        "action": "predict",
+        "missing_fields": [],
+        "follow_up_questions": [],
+        "confidence_note": "Proceeding with available data."
+    }
+
+# Frozen copy of the rule-based part of tools.disease_tool before the rules were precomputed
+def baseline_rule_prediction(symptoms, vision_result):
+    fever = symptoms.get("fever") == "yes"
+    cough = symptoms.get("cough") == "yes"
+    nasal = symptoms.get("nasal_discharge") == "yes"
+    appetite_low = symptoms.get("appetite") in ["low", "stopped"]
+    weakness = symptoms.get("weakness") == "yes"
+    digestive = symptoms.get("digestive_issue") == "yes"
+    
+    disease_signs = vision_result.get("disease_signs", [])
+    
+    if (fever and cough and nasal) or "respiratory_distress" in disease_signs:
+        return {
+            "disease": "Respiratory Infection (possible Pneumonia)",
+            "risk_level": "High",
+            "reason": "Fever with cough and nasal discharge indicates respiratory infection",
+            "care_steps": [
+                "Keep animal in dry, warm place",
+                "Ensure clean water available",
+                "Isolate from other animals"
+            ],
+            "vet_urgency": "Call vet immediately - needs antibiotics"
+        }
+    
+    if fever and digestive:
+        return {
+            "disease": "Digestive Infection (possible Enteritis)",
+            "risk_level": "High",
+            "reason": "Fever with digestive issues suggests infection",
+            "care_steps": [
+                "Provide clean water frequently",
+                "Stop solid feed temporarily",
+                "Keep animal clean"
+            ],
+            "vet_urgency": "Call vet today - may need IV fluids"
+        }
+    
+    if appetite_low and weakness:
+        return {
+            "disease": "General Weakness or Nutritional Deficiency",
+            "risk_level": "Medium",
+            "reason": "Loss of appetite with weakness",
+            "care_steps": [
+                "Offer fresh green fodder",
+                "Check for mineral deficiency",
+                "Monitor for other symptoms"
+            ],
+            "vet_urgency": "Call vet if no improvement in 24 hours"
+        }
+    
+    if cough:
+        return {
+            "disease": "Mild Respiratory Issue",
+            "risk_level": "Low",
+            "reason": "Cough without other major symptoms",
+            "care_steps": [
+                "Keep in dust-free area",
+                "Ensure good ventilation",
+                "Monitor closely"
+            ],
+            "vet_urgency": "Call vet if cough worsens or fever develops"
+        }
+    
+    return {
+        "disease": "Unable to determine specific issue",
+        "risk_level": "Medium",
+        "reason": "Symptoms present but pattern unclear",
+        "care_steps": [
+            "Monitor animal closely",
+            "Note any new symptoms",
+            "Keep animal comfortable"
+        ],
+        "vet_urgency": "Call vet for proper examination"
+    }
+
+def test_decisions_match_baseline_for_every_state():
+    checked = 0
+    for symptoms in _all_symptoms():
+        expected = baseline_decide_next_action({}, symptoms, {})
+        assert _plain(decide_next_action({}, symptoms, {})) == expected, symptoms
+        assert _plain(decide(symptoms)) == expected, symptoms
+        checked += 1
+    assert checked == 5 ** 5 * 6
+
+def test_predictions_match_baseline_for_every_state():
+    for symptoms in _all_symptoms():
+        for vision_result in VISION_RESULTS:
+            expected = baseline_rule_prediction(symptoms, vision_result)
+            assert _plain(predict(symptoms, vision_result)) == expected, (symptoms, vision_result)
+
+def test_prediction_without_vision_result():
+    symptoms = {"fever": "yes", "digestive_issue": "yes"}
+    assert predict(symptoms) is predict(symptoms, {})
+    assert predict(symptoms, None) is predict(symptoms, {})
+
+def test_records_are_shared_and_read_only():
+    symptoms = {"fever": "yes", "cough": "yes"}
+    record = decide(symptoms)
+    assert decide(dict(symptoms)) is record
+    assert isinstance(record, FrozenRecord)
+    with pytest.raises(TypeError):
+        record["action"] = "ask_more"
+    with pytest.raises(TypeError):
+        record.update(action="ask_more")
+    
+    copy = dict(record)
+    copy["action"] = "ask_more"
+    assert decide(symptoms)["action"] == "predict"
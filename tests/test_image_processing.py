@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Fused Enhancement Parity
+FusedEnhancer must reproduce the PIL ImageEnhance chain it replaced, and
+the resize-then-enhance pipeline must stay close to the old
+enhance-then-resize one
+"""
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageEnhance
+
+from image_processing import FusedEnhancer, ImageProcessor
+
+def _pil_chain(image, brightness=1.1, contrast=1.1, sharpness=1.05):
+    """The ImageEnhance chain preprocessing used before FusedEnhancer"""
+    enhanced = ImageEnhance.Brightness(Image.fromarray(image)).enhance(brightness)
+    enhanced = ImageEnhance.Contrast(enhanced).enhance(contrast)
+    enhanced = ImageEnhance.Sharpness(enhanced).enhance(sharpness)
+    return np.array(enhanced)
+
+def _photo(height, width, seed=0):
+    """Synthetic photo: lit gradient background, smooth texture, hard-edged shapes and sensor noise"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    image = np.stack([
+        60 + 120 * x / width,
+        80 + 100 * y / height,
+        140 - 60 * (x + y) / (width + height)
+    ], axis=-1)
+    
+    texture = cv2.GaussianBlur(rng.normal(0, 40, (height, width)).astype(np.float32), (0, 0), 6)
+    image += texture[..., None]
+    cv2.circle(image, (width // 3, height // 2), min(height, width) // 5, (200, 150, 90), -1)
+    cv2.rectangle(image, (width // 2, height // 4), (width * 4 // 5, height * 3 // 4), (40, 35, 30), -1)
+    image += rng.normal(0, 6, image.shape).astype(np.float32)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+@pytest.mark.parametrize("image", [
+    _photo(224, 224),
+    _photo(480, 640, seed=1),
+    np.random.default_rng(2).integers(0, 256, (97, 131, 3), dtype=np.uint8),
+    np.full((64, 64, 3), 250, dtype=np.uint8),
+    np.zeros((2, 5, 3), dtype=np.uint8)
+], ids=["photo-224", "photo-640", "noise", "bright-flat", "tiny"])
+def test_fused_enhancer_matches_pil_chain(image):
+    expected = _pil_chain(image).astype(np.int16)
+    actual = FusedEnhancer()(image).astype(np.int16)
+    assert actual.shape == expected.shape
+    assert np.abs(actual - expected).max() <= 1
+
+@pytest.mark.parametrize("factors", [(1.0, 1.0, 1.0), (0.8, 1.3, 1.5), (1.2, 0.9, 1.0)])
+def test_fused_enhancer_matches_other_factors(factors):
+    image = _photo(150, 200, seed=3)
+    expected = _pil_chain(image, *factors).astype(np.int16)
+    actual = FusedEnhancer(*factors)(image).astype(np.int16)
+    assert np.abs(actual - expected).max() <= 1
+
+def test_resize_then_enhance_pipeline_stays_close():
+    image = _photo(1200, 1600, seed=4)
+    processor = ImageProcessor()
+    
+    # Before: enhance at full resolution, then resize and normalize
+    before = cv2.resize(_pil_chain(image), processor.target_size, interpolation=cv2.INTER_AREA)
+    before = before.astype(np.float32) / 255.0
+    after = processor._preprocess_array(image)
+    
+    assert after.shape == before.shape == (224, 224, 3)
+    assert after.dtype == np.float32
+    difference = np.abs(after - before) * 255.0
+    assert difference.mean() < 1.0
+    assert difference.max() <= 6.0
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Compressed Log Segments
+Pages and case lookups that land in a gzipped segment decompress one block,
+not the whole segment
+"""
+
+import gzip
+import os
+
+import pytest
+
+import jsonl_log
+from jsonl_log import JsonlLog
+from learning_storage import JsonlStorage
+
+CASES = 300
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    monkeypatch.setattr(jsonl_log, "GZIP_BLOCK_BYTES", 4000)
+    paths = [str(tmp_path / name) for name in ("cases.jsonl", "feedback.jsonl", "breed_feedback.jsonl")]
+    
+    # Small size-rolled segments, compressed in the foreground
+    log = JsonlLog(paths[0], index_key="case_id", roll='size', max_bytes=20000, compress=False)
+    for i in range(CASES):
+        log.append({"case_id": f"c{i:04d}", "timestamp": f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}",
+                    "symptoms": {"fever": "yes", "note": "x" * 40}})
+    log._compress_segments([segment["seq"] for segment in log.segments])
+    log.save()
+    return paths
+
+@pytest.fixture
+def decompressed(monkeypatch):
+    """Sizes of the gzip blocks decompressed so far"""
+    sizes = []
+    decompress = gzip.decompress
+    
+    def counting(data):
+        data = decompress(data)
+        sizes.append(len(data))
+        return data
+    
+    monkeypatch.setattr(gzip, "decompress", counting)
+    return sizes
+
+def test_segments_are_compressed_in_blocks(paths):
+    log = JsonlLog(paths[0], index_key="case_id")
+    assert len(log.segments) >= 2
+    for segment in log.segments:
+        assert segment["compressed"]
+        assert not os.path.exists(log.segment_path(segment["seq"]))
+        assert len(jsonl_log.read_block_table(log.segment_path(segment["seq"], compressed=True))) > 2
+    
+    # Concatenated members are still one valid gzip file
+    assert sum(1 for _ in jsonl_log.iter_log_records(paths[0])) == CASES
+
+def test_pages_backward_across_compressed_segments(paths, decompressed):
+    storage = JsonlStorage(*paths)
+    seen, before = [], None
+    while True:
+        del decompressed[:]
+        cases, before = storage.get_cases(limit=20, before=before)
+        seen.extend(case["case_id"] for case in cases)
+        # A page of 20 rows spans at most two blocks
+        assert len(decompressed) <= 2 and max(decompressed, default=0) < 5000
+        if before is None:
+            break
+    
+    assert seen == [f"c{i:04d}" for i in reversed(range(CASES))]
+
+def test_case_lookup_decompresses_one_block(paths, decompressed):
+    storage = JsonlStorage(*paths)
+    assert storage.get_case("c0123")["case_id"] == "c0123"
+    assert len(decompressed) == 1 and decompressed[0] < 5000
+
+def test_single_member_segments_are_still_read(paths):
+    log = JsonlLog(paths[0], index_key="case_id")
+    seq = log.segments[0]["seq"]
+    compressed_path = log.segment_path(seq, compressed=True)
+    
+    # Compressed as one member, before segments had blocks
+    with gzip.open(compressed_path, 'rb') as source:
+        data = source.read()
+    with gzip.open(compressed_path, 'wb') as target:
+        target.write(data)
+    os.remove(jsonl_log.block_table_path(compressed_path))
+    
+    storage = JsonlStorage(*paths)
+    assert storage.get_case("c0001")["case_id"] == "c0001"
+    cases, _ = storage.get_cases(limit=CASES)
+    assert [case["case_id"] for case in cases] == [f"c{i:04d}" for i in reversed(range(CASES))]
+
+def test_clear_removes_block_tables(paths):
+    log = JsonlLog(paths[0], index_key="case_id")
+    log.clear()
+    assert os.listdir(os.path.dirname(paths[0])) == []
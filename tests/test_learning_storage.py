@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Learning Storage Backends
+Duplicate case_id checks never wait for the log writer, and case buckets
+keep a bounded window of recent periods
+"""
+
+import pytest
+
+from learning_storage import create_storage
+from log_writer import LogWriter
+
+@pytest.fixture(params=['jsonl', 'sqlite'])
+def storage(request, tmp_path):
+    writer = LogWriter(fsync='never')
+    writer.start()
+    storage = create_storage(request.param, str(tmp_path / "cases.jsonl"), str(tmp_path / "feedback.jsonl"),
+                             str(tmp_path / "breed_feedback.jsonl"), str(tmp_path / "learning.db"), writer=writer)
+    yield storage
+    writer.close()
+
+def test_duplicate_check_does_not_flush(storage, monkeypatch):
+    for case_id in ("a", "b", "b"):
+        storage.append_case({"case_id": case_id})
+    assert storage.get_case("b")["case_id"] == "b"
+    storage.flush()
+    
+    def blocked():
+        raise AssertionError("is_ambiguous_case waited for the log writer")
+    
+    monkeypatch.setattr(storage.writer, "flush", blocked)
+    assert not storage.is_ambiguous_case("a")
+    assert storage.is_ambiguous_case("b")
+
+def test_case_buckets_keep_the_most_recent_periods(storage):
+    for day in range(120):
+        for hour in (0, 12):
+            storage.append_case({"case_id": f"{day}-{hour}",
+                                 "timestamp": f"2026-{1 + day // 28:02d}-{1 + day % 28:02d}T{hour:02d}:00:00"})
+    storage.flush()
+    
+    daily, hourly = storage.case_buckets()
+    assert len(daily) == 90 and len(hourly) == 168
+    assert list(daily) == sorted(daily) and list(daily)[-1] == "2026-05-08"
+    assert set(daily.values()) == {2}
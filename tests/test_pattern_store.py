@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Pattern Store Crash Consistency
+Crashes mid-append and at each step of a snapshot must neither lose nor
+double-apply an update
+"""
+
+import os
+
+import pytest
+
+import pattern_store
+from pattern_store import PatternStore
+
+class Crash(Exception):
+    """Stands in for the process dying at a given point"""
+
+def _default_state():
+    return {"total": 0, "applied": []}
+
+def _apply(state, delta):
+    state["total"] += delta["n"]
+    state["applied"].append(delta["n"])
+
+def _open(path):
+    return PatternStore(str(path), _default_state, _apply, snapshot_every=10 ** 6)
+
+def _logs(path):
+    return sorted(name for name in os.listdir(os.path.dirname(path)) if ".wal." in name)
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "patterns.json")
+
+def test_log_replayed_without_snapshot(path):
+    store = _open(path)
+    for n in (1, 2, 3):
+        store.update({"n": n})
+    
+    assert _open(path).state == {"total": 6, "applied": [1, 2, 3]}
+
+def test_torn_final_line_is_truncated_on_replay(path):
+    store = _open(path)
+    for n in (1, 2):
+        store.update({"n": n})
+    log_path = store._log_path(store.generation)
+    with open(log_path, 'a') as f:
+        f.write('{"n":')
+    
+    reopened = _open(path)
+    assert reopened.state == {"total": 3, "applied": [1, 2]}
+    with open(log_path, 'rb') as f:
+        assert f.read().endswith(b"}\n")
+    
+    # Appends after the truncation start on a clean line
+    reopened.update({"n": 4})
+    assert _open(path).state == {"total": 7, "applied": [1, 2, 4]}
+
+def test_missing_final_newline_is_completed(path):
+    store = _open(path)
+    store.update({"n": 1})
+    log_path = store._log_path(store.generation)
+    with open(log_path, 'a') as f:
+        f.write('{"n":2}')
+    
+    reopened = _open(path)
+    assert reopened.state["applied"] == [1, 2]
+    reopened.update({"n": 3})
+    assert _open(path).state["applied"] == [1, 2, 3]
+
+def test_crash_after_generation_switch_before_replace(path, monkeypatch):
+    store = _open(path)
+    store.update({"n": 1})
+    store.snapshot()
+    store.update({"n": 2})
+    
+    def crash(*args):
+        raise Crash()
+    
+    with monkeypatch.context() as patch:
+        patch.setattr(pattern_store.os, "replace", crash)
+        with pytest.raises(Crash):
+            store.snapshot()
+    # Appends went to the new generation before the crash was noticed
+    store.update({"n": 3})
+    
+    # The snapshot still has only the first update; both logs are replayed once
+    assert len(_logs(path)) == 2
+    reopened = _open(path)
+    assert reopened.state == {"total": 6, "applied": [1, 2, 3]}
+    assert _open(path).state == {"total": 6, "applied": [1, 2, 3]}
+
+def test_crash_after_replace_before_old_logs_deleted(path, monkeypatch):
+    store = _open(path)
+    for n in (1, 2):
+        store.update({"n": n})
+    
+    def crash(*args):
+        raise Crash()
+    
+    with monkeypatch.context() as patch:
+        patch.setattr(pattern_store.os, "remove", crash)
+        with pytest.raises(Crash):
+            store.snapshot()
+    store.update({"n": 3})
+    
+    # The old generation is still on disk but already folded into the snapshot
+    assert len(_logs(path)) == 2
+    reopened = _open(path)
+    assert reopened.state == {"total": 6, "applied": [1, 2, 3]}
+    assert len(_logs(path)) == 1
+    assert _open(path).state == {"total": 6, "applied": [1, 2, 3]}
+
+def test_snapshot_drops_replayed_logs(path):
+    store = _open(path)
+    store.update({"n": 1})
+    assert store.snapshot()
+    assert not store.snapshot()
+    assert _logs(path) == [os.path.basename(store._log_path(store.generation))]
+    assert _open(path).state == {"total": 1, "applied": [1]}
+
+def test_reset_forgets_state_and_logs(path):
+    store = _open(path)
+    store.update({"n": 1})
+    store.snapshot()
+    store.update({"n": 2})
+    
+    store.reset()
+    assert store.state == _default_state()
+    assert not os.path.exists(path)
+    assert store.generation == 0
+    
+    store.update({"n": 5})
+    assert _open(path).state == {"total": 5, "applied": [5]}
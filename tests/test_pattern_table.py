@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Learning from Vet Feedback
+Only diagnoses naming a known disease are learned for a pattern, and a case
+confirmed by feedback is counted once
+"""
+
+from pattern_table import PatternTable, encode_symptoms
+
+PNEUMONIA = "Respiratory Infection (possible Pneumonia)"
+ENTERITIS = "Digestive Infection (possible Enteritis)"
+MASK = encode_symptoms({"fever": "yes", "cough": "yes", "nasal_discharge": "yes"})
+
+def _learned(table):
+    return {table.disease_names[disease_id]: int(table.counts[MASK, disease_id])
+            for disease_id in table.map_diseases[MASK]}
+
+def test_free_text_diagnoses_are_not_learned():
+    table = PatternTable()
+    for diagnosis in ("its same as vet", "fever", "same as veterian", ""):
+        table.add_feedback(diagnosis, 5, MASK, predicted=None)
+    
+    assert _learned(table) == {}
+    assert table.lookup(MASK) is None
+    # The rating still counts toward the pattern's accuracy
+    assert table.pattern_total[MASK] == 4 and table.pattern_correct[MASK] == 4
+
+def test_known_diagnoses_are_learned_by_their_rule_name():
+    table = PatternTable()
+    table.add_feedback("  digestive   infection ", 2, MASK, predicted=PNEUMONIA)
+    table.add_feedback(ENTERITIS.upper(), 5, MASK, predicted=PNEUMONIA)
+    
+    assert _learned(table) == {ENTERITIS: 2}
+    assert table.lookup(MASK)[0] == ENTERITIS
+
+def test_confirmed_prediction_counts_once():
+    table = PatternTable()
+    # learn_from_case counts the predicted disease when the case is logged
+    table.add_case(MASK, PNEUMONIA)
+    table.add_feedback(PNEUMONIA, 5, MASK, predicted=PNEUMONIA)
+    
+    assert _learned(table) == {PNEUMONIA: 1}
+    assert table.lookup(MASK) == (PNEUMONIA, 1, 1)
+
+def test_same_diagnosis_with_low_rating_is_counted():
+    table = PatternTable()
+    table.add_case(MASK, PNEUMONIA)
+    table.add_feedback(PNEUMONIA, 1, MASK, predicted=PNEUMONIA)
+    
+    assert _learned(table) == {PNEUMONIA: 2}
@@ -3,13 +3,25 @@
 Agent Tools: Vision, Symptom, Disease, Feedback
 """
 
-import json
-import re
+import os
 from datetime import datetime
 
+from decision_table import FrozenRecord, predict
+from learning_system import learning_system
+from pattern_table import NUM_PATTERNS, encode_symptoms
+from symptom_matcher import extract_symptoms
+
+# A learned pattern is used over the rules when its leading disease has more
+# than this share of the pattern's cases, seen at least this many times
+LEARNED_MIN_CONFIDENCE = float(os.environ.get('LEARNED_MIN_CONFIDENCE', 0.6))
+LEARNED_MIN_MATCHES = int(os.environ.get('LEARNED_MIN_MATCHES', 1))
+
+# (learned prediction, response) per symptom pattern
+_learned_responses = [None] * NUM_PATTERNS
+
 # Vision Tool
-def vision_tool(image_path):
-    """Extract visual info from cattle/buffalo image"""
+def vision_tool(image):
+    """Extract visual info from cattle/buffalo image (file path or upload bytes)"""
     # Placeholder - integrate with actual vision model
     return {
         "species": "cattle",
@@ -21,155 +33,47 @@ def vision_tool(image_path):
 
 # Symptom Tool
 def symptom_tool(user_text):
-    """Extract symptoms from farmer's text"""
-    text = user_text.lower()
-    
-    symptoms = {
-        "fever": "unknown",
-        "appetite": "unknown",
-        "cough": "unknown",
-        "nasal_discharge": "unknown",
-        "weakness": "unknown",
-        "digestive_issue": "unknown"
-    }
-    
-    # Fever detection
-    if any(word in text for word in ["fever", "hot", "temperature", "गर्मी"]):
-        symptoms["fever"] = "yes"
-    elif "no fever" in text:
-        symptoms["fever"] = "no"
-    
-    # Appetite detection
-    if any(word in text for word in ["not eating", "stopped eating", "no appetite", "खाना नहीं"]):
-        symptoms["appetite"] = "stopped"
-    elif any(word in text for word in ["eating less", "low appetite"]):
-        symptoms["appetite"] = "low"
-    elif any(word in text for word in ["eating normal", "eating well"]):
-        symptoms["appetite"] = "normal"
-    
-    # Cough detection
-    if any(word in text for word in ["cough", "coughing", "खांसी"]):
-        symptoms["cough"] = "yes"
-    
-    # Nasal discharge
-    if any(word in text for word in ["nasal", "discharge", "runny nose", "mucus", "नाक"]):
-        symptoms["nasal_discharge"] = "yes"
-    
-    # Weakness
-    if any(word in text for word in ["weak", "lying down", "can't stand", "कमजोर"]):
-        symptoms["weakness"] = "yes"
-    
-    # Digestive issues
-    if any(word in text for word in ["diarrhea", "loose stool", "bloat", "constipation", "दस्त"]):
-        symptoms["digestive_issue"] = "yes"
-    
-    return symptoms
+    """Extract symptoms from farmer's text (multilingual, with negation - see symptom_matcher)"""
+    return extract_symptoms(user_text)
 
 # Disease Tool
+def _learned_response(mask, learned):
+    """disease_tool answer for a learned prediction, shared until the prediction changes"""
+    cached = _learned_responses[mask]
+    if cached is None or cached[0] is not learned:
+        cached = _learned_responses[mask] = (learned, FrozenRecord(
+            disease=learned["disease"],
+            risk_level="Medium",  # Can be refined based on learning
+            reason=f"Based on {learned['pattern_matches']} similar cases",
+            care_steps=("Follow previously successful care steps", "Monitor closely"),
+            vet_urgency="Call vet if symptoms worsen",
+            learned=True,
+            confidence=learned["confidence"]
+        ))
+    return cached[1]
+
 def disease_tool(symptoms, vision_result):
     """Predict probable disease - uses FULL RICH DATA + LEARNED PATTERNS
     Self-learning: checks learned patterns first, falls back to rules
     """
-    from learning_system import learning_system
-    
-    # Try learned prediction first
-    learned = learning_system.get_learned_prediction(symptoms)
-    if learned and learned["confidence"] > 0.6:
+    # Try learned prediction first - an O(1) lookup of the pattern's leader
+    mask = encode_symptoms(symptoms)
+    learned = learning_system.learned_prediction(mask)
+    if learned and learned["confidence"] > LEARNED_MIN_CONFIDENCE \
+            and learned["pattern_matches"] >= LEARNED_MIN_MATCHES:
         # Use learned prediction if confidence is high
-        return {
-            "disease": learned["disease"],
-            "risk_level": "Medium",  # Can be refined based on learning
-            "reason": f"Based on {learned['pattern_matches']} similar cases",
-            "care_steps": ["Follow previously successful care steps", "Monitor closely"],
-            "vet_urgency": "Call vet if symptoms worsen",
-            "learned": True,
-            "confidence": learned["confidence"]
-        }
-    
-    # Fall back to rule-based logic
-    fever = symptoms.get("fever") == "yes"
-    cough = symptoms.get("cough") == "yes"
-    nasal = symptoms.get("nasal_discharge") == "yes"
-    appetite_low = symptoms.get("appetite") in ["low", "stopped"]
-    weakness = symptoms.get("weakness") == "yes"
-    digestive = symptoms.get("digestive_issue") == "yes"
-    
-    # Can also use vision_result for richer analysis
-    visible_issues = vision_result.get("visible_issues", [])
-    disease_signs = vision_result.get("disease_signs", [])
-    
-    # Pattern matching with full data
-    # Vision + symptoms combined
-    if (fever and cough and nasal) or "respiratory_distress" in disease_signs:
-        return {
-            "disease": "Respiratory Infection (possible Pneumonia)",
-            "risk_level": "High",
-            "reason": "Fever with cough and nasal discharge indicates respiratory infection",
-            "care_steps": [
-                "Keep animal in dry, warm place",
-                "Ensure clean water available",
-                "Isolate from other animals"
-            ],
-            "vet_urgency": "Call vet immediately - needs antibiotics"
-        }
-    
-    if fever and digestive:
-        return {
-            "disease": "Digestive Infection (possible Enteritis)",
-            "risk_level": "High",
-            "reason": "Fever with digestive issues suggests infection",
-            "care_steps": [
-                "Provide clean water frequently",
-                "Stop solid feed temporarily",
-                "Keep animal clean"
-            ],
-            "vet_urgency": "Call vet today - may need IV fluids"
-        }
+        return _learned_response(mask, learned)
     
-    if appetite_low and weakness:
-        return {
-            "disease": "General Weakness or Nutritional Deficiency",
-            "risk_level": "Medium",
-            "reason": "Loss of appetite with weakness",
-            "care_steps": [
-                "Offer fresh green fodder",
-                "Check for mineral deficiency",
-                "Monitor for other symptoms"
-            ],
-            "vet_urgency": "Call vet if no improvement in 24 hours"
-        }
-    
-    if cough:
-        return {
-            "disease": "Mild Respiratory Issue",
-            "risk_level": "Low",
-            "reason": "Cough without other major symptoms",
-            "care_steps": [
-                "Keep in dust-free area",
-                "Ensure good ventilation",
-                "Monitor closely"
-            ],
-            "vet_urgency": "Call vet if cough worsens or fever develops"
-        }
-    
-    # Default
-    return {
-        "disease": "Unable to determine specific issue",
-        "risk_level": "Medium",
-        "reason": "Symptoms present but pattern unclear",
-        "care_steps": [
-            "Monitor animal closely",
-            "Note any new symptoms",
-            "Keep animal comfortable"
-        ],
-        "vet_urgency": "Call vet for proper examination"
-    }
+    # Fall back to rule-based logic (decision_table.DISEASE_RULES; vision signs
+    # such as respiratory_distress are part of the precomputed table)
+    return predict(symptoms, vision_result)
 
 # Feedback Tool
-def feedback_tool(case_data, rating=None, vet_diagnosis=None):
-    """Store case for learning - integrates with self-learning system"""
-    from learning_system import learning_system
-    
+def feedback_tool(case_data, rating=None, vet_diagnosis=None, learn=True):
+    """Store case for learning - integrates with self-learning system
+    With learn=False the case is stored but its patterns are left to
+    learning_system.learn_from_case
+    """
     case_data["feedback"] = {
         "rating": rating,
         "vet_diagnosis": vet_diagnosis,
@@ -178,7 +82,7 @@ def feedback_tool(case_data, rating=None, vet_diagnosis=None):
     }
     
     # Log to learning system
-    learning_system.log_case(case_data)
+    learning_system.log_case(case_data, learn=learn)
     
     # If feedback provided, log separately
     if rating or vet_diagnosis:
@@ -187,7 +91,7 @@ def feedback_tool(case_data, rating=None, vet_diagnosis=None):
             {
                 "rating": rating,
                 "actual_diagnosis": vet_diagnosis,
-                "predicted_disease": case_data.get("disease_prediction", {}).get("disease")
+                "predicted_disease": (case_data.get("disease_prediction") or {}).get("disease")
             }
         )
     
@@ -2,8 +2,9 @@
 Utility Functions for Cattle Breed Recognition System
 """
 
+import atexit
 import os
-import json
+import threading
 from datetime import datetime
 from flask import jsonify
 
@@ -65,6 +66,22 @@ def get_breed_info():
         }
     }
 
+PREDICTIONS_LOG = 'logs/predictions.jsonl'
+
+_prediction_log = None
+_prediction_log_lock = threading.Lock()
+
+def prediction_log():
+    """Segmented prediction log (opened on first use)"""
+    global _prediction_log
+    with _prediction_log_lock:
+        if _prediction_log is None:
+            from jsonl_log import JsonlLog
+            from log_writer import log_writer
+            _prediction_log = JsonlLog(PREDICTIONS_LOG, writer=log_writer)
+            atexit.register(_prediction_log.save)
+        return _prediction_log
+
 def log_prediction(image_path, prediction_result):
     """Log prediction results for analytics"""
     try:
@@ -75,12 +92,8 @@ def log_prediction(image_path, prediction_result):
             'confidence': prediction_result.get('confidence', 0)
         }
         
-        # Ensure logs directory exists
-        os.makedirs('logs', exist_ok=True)
-        
-        # Append to log file
-        with open('logs/predictions.jsonl', 'a') as f:
-            f.write(json.dumps(log_entry) + '\n')
+        # Queued for the background writer; rolled and compressed like the learning logs
+        prediction_log().append(log_entry)
             
     except Exception as e:
         print(f"Failed to log prediction: {str(e)}")